@@ -2,18 +2,45 @@ import pygame
 import random
 import math
 from enum import Enum
-from dataclasses import dataclass
-from typing import List, Tuple, Optional, Set
+from dataclasses import dataclass, asdict, astuple
+from typing import List, Tuple, Optional, Set, Dict, Callable
 import heapq
+import bisect
+import time
+import argparse
+import asyncio
+import threading
+import queue
+import zlib
+import itertools
+import copy
+import hashlib
+import json
+import os
+import struct
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+import contextlib
+import numpy as np
 
 # Initialisation Pygame
 pygame.init()
 
+_fonts: Dict[int, pygame.font.Font] = {}
+
+def get_font(size: int) -> pygame.font.Font:
+    """Police par défaut, chargée une fois par taille (dessin de chaque frame)"""
+    if size not in _fonts:
+        _fonts[size] = pygame.font.Font(None, size)
+    return _fonts[size]
+
 # Constantes
 WIDTH, HEIGHT = 1300, 800
 FPS = 60
 TILE_SIZE = 20  # Grille pour pathfinding
+ROBOT_RADIUS = 18  # Rayon du corps de l'aspirateur (px)
+CLEARANCE_CELL = TILE_SIZE // 4  # Résolution du champ de dégagement (px)
+CLEARANCE_WEIGHT = 1.0  # Surcoût A* d'une case qui frôle un meuble (mode --clearance)
 
 # Timing
 CYCLE_DURATION = 120  # 2 minutes
@@ -28,6 +55,25 @@ BATTERY_DRAIN_CLEAN_BASE = 1.5  # Par seconde
 MAX_DIRT_CAPACITY = 100
 DIRT_PER_CLEAN = 25
 
+# Heuristique ALT: points de repère par plan
+LANDMARK_COUNT = 8
+
+# Pathfinding découpé dans le temps (budget par agent et par frame)
+SEARCH_NODES_PER_TICK = 200
+SEARCH_TIME_PER_TICK = 0.002  # Secondes
+COOP_TIME_PER_TICK = 0.006  # Secondes de planification WHCA* par frame (toute la flotte)
+
+@dataclass(frozen=True)
+class Policy:
+    """Constantes de comportement (réglables avec --tune)"""
+    dirt_weight: float = 2  # Priorité: poids du niveau de saleté
+    frequency_weight: float = 0.5  # Priorité: poids de la fréquence apprise
+    maintenance_battery: float = 25  # Maintenance sous ce niveau de batterie...
+    maintenance_bin: float = 1.0  # ... ou bac rempli à cette fraction
+    empty_threshold: float = 0.8  # Vidage à la station au-delà de cette fraction du bac
+    charge_threshold: float = 90  # Recharge à la station sous ce niveau
+    speed: float = 4
+
 # Couleurs modernes
 class Colors:
     BG = (15, 23, 42)
@@ -61,6 +107,7 @@ class AgentState(Enum):
     CHARGING = "recharge"
     EMPTYING = "vidage"
     RETURNING = "retour station"
+    PLANNING = "planification"
 
 @dataclass
 class Particle:
@@ -112,7 +159,7 @@ class Obstacle:
                         width=2, border_radius=5)
         
         # Nom du meuble
-        font = pygame.font.Font(None, 16)
+        font = get_font(16)
         text = font.render(self.name, True, Colors.TEXT)
         text_rect = text.get_rect(center=(self.x + self.width//2, self.y + self.height//2))
         screen.blit(text, text_rect)
@@ -122,17 +169,32 @@ class Obstacle:
 
 class Room:
     """Pièce avec niveau de saleté"""
+    rng = random  # Générateur des particules (propre à chaque copie de simulation)
+    
     def __init__(self, name: str, x: int, y: int, width: int, height: int):
         self.name = name
         self.x = x
         self.y = y
         self.width = width
         self.height = height
-        self.dirt_level = DirtLevel.CLEAN
+        self._dirt_level = DirtLevel.CLEAN
+        self.listeners: List[Callable[['Room', DirtLevel, DirtLevel], None]] = []
         self.dirt_particles = []
         self.center = (x + width // 2, y + height // 2)
         self.dirt_history = []  # Historique pour apprendre
         self.last_cleaned = 0
+    
+    @property
+    def dirt_level(self) -> DirtLevel:
+        return self._dirt_level
+    
+    @dirt_level.setter
+    def dirt_level(self, level: DirtLevel):
+        """Change le niveau et prévient les index (compteurs, files de priorité)"""
+        old, self._dirt_level = self._dirt_level, level
+        if old != level:
+            for listener in self.listeners:
+                listener(self, old, level)
         
     def get_dirt_value(self) -> int:
         return self.dirt_level.value
@@ -158,11 +220,14 @@ class Room:
         self.dirt_particles = []
         num_particles = 10 + self.dirt_level.value * 10
         for _ in range(num_particles):
-            px = random.randint(self.x + 10, self.x + self.width - 10)
-            py = random.randint(self.y + 10, self.y + self.height - 10)
-            size = random.uniform(2, 4 + self.dirt_level.value)
+            px = self.rng.randint(self.x + 10, self.x + self.width - 10)
+            py = self.rng.randint(self.y + 10, self.y + self.height - 10)
+            size = self.rng.uniform(2, 4 + self.dirt_level.value)
             self.dirt_particles.append((px, py, size))
     
+    def contains_point(self, x: float, y: float) -> bool:
+        return self.x < x < self.x + self.width and self.y < y < self.y + self.height
+    
     def clean(self, current_time: float):
         """Nettoie la pièce"""
         self.dirt_level = DirtLevel.CLEAN
@@ -198,23 +263,160 @@ class Room:
             pygame.draw.circle(screen, (120, 53, 15), (int(px), int(py)), int(size))
         
         # Nom
-        font = pygame.font.Font(None, 28)
+        font = get_font(28)
         text = font.render(self.name, True, Colors.TEXT)
         screen.blit(text, (self.x + 10, self.y + 10))
         
         # Niveau de saleté
         level_names = ["PROPRE", "POUSSIÉREUX", "SALE", "TRÈS SALE"]
-        level_font = pygame.font.Font(None, 20)
+        level_font = get_font(20)
         level_text = level_font.render(level_names[self.dirt_level.value], True, Colors.TEXT)
         screen.blit(level_text, (self.x + 10, self.y + 40))
 
+# Index de saleté
+
+class FenwickTree:
+    """Arbre de Fenwick: sommes préfixes et k-ième élément en O(log n)"""
+    def __init__(self, size: int):
+        self.tree = [0] * (size + 1)
+    
+    def add(self, index: int, delta: int):
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+    
+    def prefix(self, count: int) -> int:
+        """Somme des count premiers éléments"""
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+    
+    def append(self):
+        """Nouvel élément nul en fin: son noeud couvre des éléments déjà présents (O(log n))"""
+        i = len(self.tree)
+        self.tree.append(self.prefix(i - 1) - self.prefix(i - (i & -i)))
+    
+    def find(self, k: int) -> int:
+        """Index du k-ième élément compté (k à partir de 0)"""
+        size = len(self.tree) - 1
+        pos, remaining = 0, k + 1
+        step = 1 << size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= size and self.tree[nxt] < remaining:
+                pos = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+class DirtIndex:
+    """Compteurs par niveau, pièces sales et pièces encore salissables, tenus à jour
+    à chaque changement de niveau (au lieu de parcourir toutes les pièces)"""
+    def __init__(self):
+        self.rooms: List[Room] = []
+        self.positions: Dict[Room, int] = {}
+        self.level_counts = [0] * len(DirtLevel)
+        self.dirty: Dict[Room, None] = {}
+        self.not_saturated = FenwickTree(0)
+        self.not_saturated_count = 0
+        self.listeners: List[Callable[[Room, int], None]] = []
+    
+    def add(self, room: Room):
+        self.positions[room] = len(self.rooms)
+        self.rooms.append(room)
+        self.not_saturated.append()
+        if room.dirt_level != DirtLevel.VERY_DIRTY:
+            self.not_saturated.add(self.positions[room], 1)
+            self.not_saturated_count += 1
+        self.level_counts[room.dirt_level.value] += 1
+        if room.dirt_level != DirtLevel.CLEAN:
+            self.dirty[room] = None
+        room.listeners.append(self.on_level_change)
+    
+    def on_level_change(self, room: Room, old: DirtLevel, new: DirtLevel):
+        position = self.positions[room]
+        self.level_counts[old.value] -= 1
+        self.level_counts[new.value] += 1
+        if new == DirtLevel.CLEAN:
+            self.dirty.pop(room, None)
+        else:
+            self.dirty[room] = None
+        saturated = (old == DirtLevel.VERY_DIRTY) - (new == DirtLevel.VERY_DIRTY)
+        if saturated:
+            self.not_saturated.add(position, saturated)
+            self.not_saturated_count += saturated
+        for listener in self.listeners:
+            listener(room, position)
+    
+    @property
+    def clean_count(self) -> int:
+        return self.level_counts[DirtLevel.CLEAN.value]
+    
+    def dirty_rooms(self) -> List[Room]:
+        return sorted(self.dirty, key=self.positions.__getitem__)
+    
+    def not_saturated_room(self, k: int) -> Room:
+        """k-ième pièce non saturée dans l'ordre des pièces"""
+        return self.rooms[self.not_saturated.find(k)]
+
+class RoomPriorityQueue:
+    """File de priorité des pièces sales d'un agent (tas max à suppression paresseuse)"""
+    def __init__(self, score: Callable[[Room], float]):
+        self.score = score
+        self.heap: List[Tuple[float, int, Room]] = []
+        self.entries: Dict[Room, Tuple[float, int]] = {}
+    
+    def update(self, room: Room, position: int):
+        """Réinsère la pièce avec son score courant (retirée si propre)"""
+        if room.dirt_level == DirtLevel.CLEAN:
+            self.entries.pop(room, None)
+            return
+        key = (-self.score(room), position)
+        if self.entries.get(room) == key:
+            return
+        self.entries[room] = key
+        heapq.heappush(self.heap, (key[0], position, room))
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = [(k[0], k[1], r) for r, k in self.entries.items()]
+            heapq.heapify(self.heap)
+    
+    def clear(self):
+        self.heap = []
+        self.entries = {}
+    
+    def refresh(self, room: Room):
+        if room in self.entries:
+            self.update(room, self.entries[room][1])
+    
+    def best(self, exclude: Set[Room] = frozenset()) -> Optional[Room]:
+        """Pièce de score maximal hors exclude (la première dans l'ordre des pièces à égalité)"""
+        skipped = []
+        result = None
+        while self.heap:
+            score, position, room = self.heap[0]
+            if self.entries.get(room) != (score, position):
+                heapq.heappop(self.heap)  # entrée périmée
+            elif room in exclude:
+                skipped.append(heapq.heappop(self.heap))
+            else:
+                result = room
+                break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return result
+
 class ChargingStation:
     """Station de chargement"""
+    WIDTH, HEIGHT = 100, 80
+    
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
-        self.width = 100
-        self.height = 80
+        self.width = self.WIDTH
+        self.height = self.HEIGHT
         self.center = (x + self.width // 2, y + self.height // 2)
         self.animation = 0
         
@@ -239,7 +441,7 @@ class ChargingStation:
             screen.blit(border_surface, (self.x - i*2, self.y - i*2))
         
         # Symboles
-        font = pygame.font.Font(None, 35)
+        font = get_font(35)
         bolt = font.render("⚡", True, (255, 215, 0))
         screen.blit(bolt, (self.x + 15, self.y + 15))
         
@@ -247,16 +449,458 @@ class ChargingStation:
         screen.blit(trash, (self.x + 55, self.y + 15))
         
         # Texte
-        text_font = pygame.font.Font(None, 18)
+        text_font = get_font(18)
         text = text_font.render("STATION", True, Colors.TEXT)
         screen.blit(text, (self.x + 20, self.y + 55))
 
+# 8 directions (4 directions + diagonales)
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0),
+              (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+def move_cost(dx: int, dy: int) -> float:
+    return 1.4 if abs(dx) + abs(dy) == 2 else 1  # Diagonale coûte plus
+
+def distance_field_steps(walkable: np.ndarray, sources: List[Tuple[int, int]]):
+    """Distances exactes depuis les sources (grille à 8 voisins), générateur repris seau par seau:
+    Dijkstra à seaux sur les coûts entiers 5 et 7 (1 et 1.4 au cinquième), chaque seau relâché
+    d'un bloc avec NumPy; renvoie le champ [x, y] (inf hors d'atteinte) en fin d'itération"""
+    width, height = walkable.shape
+    stride = height + 2  # Bordure bloquée: pas de test de limites
+    free = np.zeros((width + 2, stride), dtype=bool)
+    free[1:-1, 1:-1] = walkable
+    free = free.ravel()
+    unreached = np.iinfo(np.int64).max
+    dist = np.full(free.size, unreached, dtype=np.int64)
+    cells = np.array([(x + 1) * stride + y + 1 for x, y in sources
+                      if 0 <= x < width and 0 <= y < height and walkable[x, y]], dtype=np.int64)
+    dist[cells] = 0
+    buckets = defaultdict(list)
+    if len(cells):
+        buckets[0].append(cells)
+    moves = [(np.array([dx * stride + dy for dx, dy in DIRECTIONS if abs(dx) + abs(dy) == n]), cost)
+             for n, cost in ((1, 5), (2, 7))]
+    d = 0
+    while buckets:
+        if d in buckets:
+            cells = np.concatenate(buckets.pop(d))
+            cells = cells[dist[cells] == d]  # Doublons sans effet: relâchés deux fois au même coût
+            for offsets, cost in moves:
+                neighbors = (cells[:, None] + offsets).ravel()
+                neighbors = neighbors[free[neighbors] & (dist[neighbors] > d + cost)]
+                if len(neighbors):
+                    dist[neighbors] = d + cost
+                    buckets[d + cost].append(neighbors)
+            yield
+        d += 1
+    dist = dist.reshape(width + 2, stride)[1:-1, 1:-1]
+    return np.where(dist == unreached, np.inf, dist / 5)
+
+def run_steps(steps):
+    """Mène un calcul reprenable (générateur) à son terme, renvoie son résultat"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+def distance_field(walkable: np.ndarray, sources: List[Tuple[int, int]]) -> np.ndarray:
+    """Distances exactes depuis les sources (Dijkstra sur la grille à 8 voisins)"""
+    return run_steps(distance_field_steps(walkable, sources))
+
+class LandmarkTable:
+    """Distances aux points de repère (ALT), rangées par case ([x, y, repère]) pour lire d'un
+    bloc les distances d'une case; calculées une fois par plan (cache de navigation)"""
+    UNREACHED = 1e30  # Case hors d'atteinte d'un repère: borne infinie sans NaN
+    
+    def __init__(self, landmarks: np.ndarray, distances: np.ndarray):
+        self.landmarks = landmarks  # [repère, (x, y)]
+        self.distances = distances
+    
+    @classmethod
+    def build_steps(cls, walkable: np.ndarray, count: int = LANDMARK_COUNT):
+        """Construction reprenable (générateur, voir distance_field_steps): chaque repère au point
+        le plus éloigné des repères déjà choisis, les zones non atteintes d'abord"""
+        landmarks = []
+        fields = []
+        free = np.argwhere(walkable)
+        if len(free):
+            spread = yield from distance_field_steps(walkable, [tuple(free[0])])
+            for _ in range(count):
+                candidates = np.where(walkable, spread, -1)
+                landmark = np.unravel_index(np.argmax(candidates), walkable.shape)
+                if candidates[landmark] <= 0 and landmarks:
+                    break
+                field = yield from distance_field_steps(walkable, [landmark])
+                spread = field if not landmarks else np.minimum(spread, field)
+                landmarks.append(landmark)
+                fields.append(np.minimum(field, cls.UNREACHED))
+        distances = np.zeros((*walkable.shape, len(fields)), dtype=np.float32)
+        for k, field in enumerate(fields):
+            distances[:, :, k] = field
+        return cls(np.array(landmarks, dtype=np.int32).reshape(-1, 2), distances)
+    
+    @classmethod
+    def build(cls, walkable: np.ndarray, count: int = LANDMARK_COUNT) -> 'LandmarkTable':
+        return run_steps(cls.build_steps(walkable, count))
+    
+    def bound(self, x1: int, y1: int, x2: int, y2: int) -> float:
+        """Borne inférieure admissible de la distance entre deux cases"""
+        dx, dy = abs(x1 - x2), abs(y1 - y2)
+        octile = max(dx, dy) + 0.4 * min(dx, dy)
+        if not self.distances.shape[2]:
+            return octile
+        return max(octile, float(np.abs(self.distances[x1, y1] - self.distances[x2, y2]).max()))
+    
+    def potential(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Callable[[Tuple[int, int]], float]:
+        """Potentiel moyen p(v) = (π_but(v) - π_départ(v)) / 2 de l'A* bidirectionnel, calculé
+        à la première demande de chaque case et gardé pour la requête"""
+        cache = {}
+        
+        def potential(cell: Tuple[int, int]) -> float:
+            value = cache.get(cell)
+            if value is None:
+                value = cache[cell] = (self.bound(*cell, *goal) - self.bound(*cell, *start)) / 2
+            return value
+        return potential
+
+def blocked_tiles(x: int, y: int, width: int, height: int) -> Tuple[slice, slice]:
+    """Cases dont le coin (x * TILE_SIZE, y * TILE_SIZE) est dans le rectangle"""
+    x0, x1 = -(-x // TILE_SIZE), -(-(x + width) // TILE_SIZE)
+    y0, y1 = -(-y // TILE_SIZE), -(-(y + height) // TILE_SIZE)
+    return slice(max(0, x0), max(0, x1)), slice(max(0, y0), max(0, y1))
+
+# Champ de dégagement
+
+def squared_distance_1d(f: np.ndarray) -> np.ndarray:
+    """Transformée de distance au carré le long du dernier axe: min_p (q - p)² + f[p]
+    (enveloppe inférieure de paraboles de Felzenszwalb-Huttenlocher, toutes les lignes à la fois)"""
+    count, n = f.shape
+    rows = np.arange(count)
+    v = np.zeros((count, n), dtype=np.int64)  # Sommets des paraboles de l'enveloppe
+    z = np.full((count, n + 1), np.inf)  # Bornes des intervalles où chaque parabole est minimale
+    z[:, 0] = -np.inf
+    k = np.zeros(count, dtype=np.int64)
+    for q in range(1, n):
+        pending = rows
+        while len(pending):
+            vk = v[pending, k[pending]]
+            s = ((f[pending, q] + q * q) - (f[pending, vk] + vk * vk)) / (2 * (q - vk))
+            drop = s <= z[pending, k[pending]]
+            k[pending[drop]] -= 1  # Parabole masquée par la nouvelle: on la retire
+            done = pending[~drop]
+            k[done] += 1
+            v[done, k[done]] = q
+            z[done, k[done]] = s[~drop]
+            z[done, k[done] + 1] = np.inf
+            pending = pending[drop]
+    
+    d = np.empty(f.shape)
+    k[:] = 0
+    for q in range(n):
+        while True:
+            ahead = z[rows, k + 1] < q
+            if not ahead.any():
+                break
+            k[ahead] += 1
+        vk = v[rows, k]
+        d[:, q] = (q - vk) ** 2 + f[rows, vk]
+    return d
+
+class ClearanceField:
+    """Distance (px) de chaque point au meuble ou au mur le plus proche: transformée de
+    distance euclidienne exacte d'une grille d'occupation fine, calculée une fois par plan"""
+    def __init__(self, width: int, height: int, obstacles: List[Obstacle], cell: int = CLEARANCE_CELL):
+        self.cell = cell
+        grid_width, grid_height = -(-width // cell), -(-height // cell)
+        
+        # Cellules touchées par un obstacle, cadre d'une cellule autour du plan (les murs)
+        occupied = np.ones((grid_width + 2, grid_height + 2), dtype=bool)
+        occupied[1:-1, 1:-1] = False
+        for o in obstacles:
+            occupied[1 + max(0, o.x // cell):1 + min(grid_width, -(-(o.x + o.width) // cell)),
+                     1 + max(0, o.y // cell):1 + min(grid_height, -(-(o.y + o.height) // cell))] = True
+        
+        # Passes séparables: colonnes puis lignes (valeur finie partout grâce au cadre)
+        big = float((grid_width + grid_height + 4) ** 2)
+        d2 = squared_distance_1d(np.where(occupied, 0.0, big))
+        d2 = squared_distance_1d(d2.T).T
+        # Borne inférieure pour tout point de la cellule: une demi-diagonale du point au centre,
+        # une autre du centre de la cellule occupée à l'obstacle qui peut n'en couvrir qu'un coin
+        self.distance = np.maximum((np.sqrt(d2[1:-1, 1:-1]) - math.sqrt(2)) * cell, 0).astype(np.float32)
+    
+    def at(self, x: float, y: float) -> float:
+        """Dégagement au point (0 hors du plan), en O(1), jamais surestimé"""
+        ix, iy = int(x // self.cell), int(y // self.cell)
+        if not (0 <= ix < self.distance.shape[0] and 0 <= iy < self.distance.shape[1]):
+            return 0.0
+        return float(self.distance[ix, iy])
+    
+    def fits(self, x: float, y: float, radius: float = ROBOT_RADIUS) -> bool:
+        """Un disque de ce rayon centré au point ne touche ni meuble ni mur"""
+        return self.at(x, y) >= radius
+    
+    def tiles(self, grid_width: int, grid_height: int) -> np.ndarray:
+        """Dégagement au centre de chaque case de la grille A*, indexé [x, y]"""
+        size_x, size_y = self.distance.shape
+        ix = np.minimum((np.arange(grid_width) * TILE_SIZE + TILE_SIZE // 2) // self.cell, size_x - 1)
+        iy = np.minimum((np.arange(grid_height) * TILE_SIZE + TILE_SIZE // 2) // self.cell, size_y - 1)
+        return self.distance[np.ix_(ix, iy)]
+
+class SpatialIndex:
+    """Index spatial par grille uniforme sur des rectangles (x, y, width, height)"""
+    def __init__(self, cell_size: int = 128):
+        self.cell_size = cell_size
+        self.buckets = defaultdict(list)  # (cx, cy) → éléments
+        self.cells = {}  # id(élément) → cases occupées
+        self.order = {}  # id(élément) → rang d'insertion (résultats dans l'ordre des listes)
+        self.counter = 0
+        self.bounds = None  # (cx0, cy0, cx1, cy1) des cases occupées
+    
+    def _cell_range(self, x: float, y: float, width: float, height: float):
+        cs = self.cell_size
+        return (int(x // cs), int(y // cs), int((x + width) // cs), int((y + height) // cs))
+    
+    def insert(self, item):
+        cx0, cy0, cx1, cy1 = self._cell_range(item.x, item.y, item.width, item.height)
+        keys = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        for key in keys:
+            self.buckets[key].append(item)
+        self.cells[id(item)] = keys
+        self.order[id(item)] = self.counter
+        self.counter += 1
+        if self.bounds is None:
+            self.bounds = (cx0, cy0, cx1, cy1)
+        else:
+            bx0, by0, bx1, by1 = self.bounds
+            self.bounds = (min(bx0, cx0), min(by0, cy0), max(bx1, cx1), max(by1, cy1))
+    
+    def remove(self, item):
+        for key in self.cells.pop(id(item), []):
+            bucket = self.buckets[key]
+            bucket.remove(item)
+            if not bucket:
+                del self.buckets[key]
+        self.order.pop(id(item), None)
+    
+    def update(self, item):
+        """À appeler quand un élément est déplacé ou redimensionné (garde son rang)"""
+        rank = self.order.get(id(item))
+        self.remove(item)
+        self.insert(item)
+        if rank is not None:
+            self.order[id(item)] = rank
+    
+    def _sorted(self, items, kind):
+        found = {id(item): item for item in items if kind is None or isinstance(item, kind)}
+        return sorted(found.values(), key=lambda item: self.order[id(item)])
+    
+    def query_point(self, x: float, y: float, kind: type = None) -> list:
+        """Éléments dont le rectangle fermé contient le point"""
+        bucket = self.buckets.get((int(x // self.cell_size), int(y // self.cell_size)), ())
+        return self._sorted((item for item in bucket
+                             if item.x <= x <= item.x + item.width and item.y <= y <= item.y + item.height),
+                            kind)
+    
+    def query_rect(self, x: float, y: float, width: float, height: float, kind: type = None) -> list:
+        """Éléments dont le rectangle fermé touche le rectangle donné"""
+        cx0, cy0, cx1, cy1 = self._cell_range(x, y, width, height)
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for item in self.buckets.get((cx, cy), ()):
+                    if item.x <= x + width and x <= item.x + item.width and \
+                            item.y <= y + height and y <= item.y + item.height:
+                        found.append(item)
+        return self._sorted(found, kind)
+    
+    def nearest(self, x: float, y: float, kind: type = None):
+        """Élément le plus proche du point (distance au rectangle), recherche par anneaux"""
+        if self.bounds is None:
+            return None
+        cs = self.cell_size
+        px, py = int(x // cs), int(y // cs)
+        bx0, by0, bx1, by1 = self.bounds
+        max_ring = max(abs(px - bx0), abs(px - bx1), abs(py - by0), abs(py - by1))
+        best, best_dist = None, float('inf')
+        for ring in range(max_ring + 1):
+            for cx in range(px - ring, px + ring + 1):
+                for cy in range(py - ring, py + ring + 1):
+                    if max(abs(cx - px), abs(cy - py)) != ring:
+                        continue
+                    for item in self.buckets.get((cx, cy), ()):
+                        if kind is not None and not isinstance(item, kind):
+                            continue
+                        dx = max(item.x - x, 0, x - (item.x + item.width))
+                        dy = max(item.y - y, 0, y - (item.y + item.height))
+                        dist = math.hypot(dx, dy)
+                        if dist < best_dist or (dist == best_dist and self.order[id(item)] < self.order[id(best)]):
+                            best, best_dist = item, dist
+            # Tout élément hors des anneaux parcourus est à au moins ring * cs
+            if best is not None and best_dist <= ring * cs:
+                break
+        return best
+
+NAV_CACHE_MAGIC = b"ASPNAV"
+NAV_CACHE_VERSION = 3
+
+class NavigationData:
+    """Grilles dérivées du plan (praticabilité, distance à la station, tables ALT)"""
+    ARRAYS = (("walkable", np.bool_), ("station_distance", np.float32),
+              ("landmarks", np.int32), ("landmark_distances", np.float32))
+    
+    def __init__(self, walkable: np.ndarray, station_distance: np.ndarray,
+                 landmarks: np.ndarray, landmark_distances: np.ndarray):
+        self.walkable = walkable  # [x, y], coin de case hors obstacle
+        self.station_distance = station_distance  # [x, y], distance A* à la station
+        self.landmarks = landmarks  # [repère, (x, y)]
+        self.landmark_distances = landmark_distances  # [x, y, repère], voir LandmarkTable
+    
+    def landmark_table(self) -> LandmarkTable:
+        return LandmarkTable(self.landmarks, self.landmark_distances)
+    
+    @staticmethod
+    def plan_key(plan: dict) -> str:
+        """Empreinte du plan et des paramètres de compilation"""
+        source = json.dumps(plan, sort_keys=True) + f"|{TILE_SIZE}|{NAV_CACHE_VERSION}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+    
+    @classmethod
+    def compile(cls, plan: dict) -> 'NavigationData':
+        """Rasterise le plan sur la grille de tuiles (sans boucle par case)"""
+        grid_width = plan["width"] // TILE_SIZE
+        grid_height = plan["height"] // TILE_SIZE
+        
+        # Une case est bloquée si son coin (x * TILE_SIZE, y * TILE_SIZE) est dans un obstacle
+        walkable = np.ones((grid_width, grid_height), dtype=bool)
+        for o in plan["obstacles"]:
+            walkable[blocked_tiles(o["x"], o["y"], o["width"], o["height"])] = False
+        
+        station = plan["station"]
+        station_cell = ((station["x"] + ChargingStation.WIDTH // 2) // TILE_SIZE,
+                        (station["y"] + ChargingStation.HEIGHT // 2) // TILE_SIZE)
+        station_distance = distance_field(walkable, [station_cell]).astype(np.float32)
+        table = LandmarkTable.build(walkable)
+        return cls(walkable, station_distance, table.landmarks, table.distances)
+    
+    @classmethod
+    def load(cls, plan: dict, cache_path: str) -> 'NavigationData':
+        """Projette le cache en mémoire s'il est à jour, sinon compile et l'écrit"""
+        key = cls.plan_key(plan)
+        navigation = cls.read_cache(cache_path, key)
+        if navigation is None:
+            navigation = cls.compile(plan)
+            try:
+                navigation.write_cache(cache_path, key)
+            except OSError as e:
+                print(f"⚠️ Cache de navigation non écrit: {e}")
+        return navigation
+    
+    def write_cache(self, path: str, key: str):
+        """Format: magic, version, taille d'en-tête, en-tête JSON, tableaux alignés sur 64 octets"""
+        arrays = {}
+        layout = {}
+        offset = 0
+        for name, dtype in self.ARRAYS:
+            arrays[name] = np.ascontiguousarray(getattr(self, name), dtype=dtype)
+            offset = -(-offset // 64) * 64
+            layout[name] = {"dtype": np.dtype(dtype).str, "shape": arrays[name].shape, "offset": offset}
+            offset += arrays[name].nbytes
+        header = json.dumps({"key": key, "arrays": layout}).encode("utf-8")
+        prefix = NAV_CACHE_MAGIC + struct.pack("<HI", NAV_CACHE_VERSION, len(header)) + header
+        data_start = -(-len(prefix) // 64) * 64
+        
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(prefix.ljust(data_start, b"\0"))
+            for name, _ in self.ARRAYS:
+                f.seek(data_start + layout[name]["offset"])
+                f.write(arrays[name].tobytes())
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def read_cache(cls, path: str, key: str) -> Optional['NavigationData']:
+        """Tableaux en lecture seule projetés depuis le fichier, None si absent ou périmé"""
+        try:
+            with open(path, "rb") as f:
+                magic = f.read(len(NAV_CACHE_MAGIC))
+                version, header_len = struct.unpack("<HI", f.read(6))
+                if magic != NAV_CACHE_MAGIC or version != NAV_CACHE_VERSION:
+                    return None
+                header = json.loads(f.read(header_len))
+        except (OSError, struct.error, ValueError):
+            return None
+        if header.get("key") != key:
+            return None
+        
+        data_start = -(-(len(NAV_CACHE_MAGIC) + 6 + header_len) // 64) * 64
+        arrays = {}
+        try:
+            for name, _ in cls.ARRAYS:
+                spec = header["arrays"][name]
+                arrays[name] = np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r",
+                                         offset=data_start + spec["offset"], shape=tuple(spec["shape"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # Fichier tronqué ou en-tête incohérent: recompilé
+        return cls(**arrays)
+
 class PathfindingAStar:
     """Pathfinding A* pour navigation optimale"""
-    def __init__(self, environment):
+    def __init__(self, environment, heuristic: str = "manhattan"):
         self.environment = environment
-        self.grid_width = WIDTH // TILE_SIZE
-        self.grid_height = HEIGHT // TILE_SIZE
+        self.grid_width = getattr(environment, "width", WIDTH) // TILE_SIZE
+        self.grid_height = getattr(environment, "height", HEIGHT) // TILE_SIZE
+        navigation = getattr(environment, "navigation", None)
+        self._walkable = navigation.walkable if navigation is not None else None
+        self.penalty: Optional[np.ndarray] = None  # Surcoût d'entrée par case (mode --clearance)
+        self.landmarks: Optional[LandmarkTable] = None
+        self.last_expansions = 0
+        if heuristic == "alt":
+            self.build_landmarks()
+    
+    def use_clearance(self, walkable: np.ndarray, clearance: np.ndarray, radius: float = ROBOT_RADIUS,
+                      weight: float = CLEARANCE_WEIGHT):
+        """Obstacles gonflés du rayon du robot et surcoût des cases à moins de deux rayons d'un meuble"""
+        self._walkable = walkable & (clearance >= radius)
+        self.penalty = weight * np.clip((2 * radius - clearance) / radius, 0, 1)
+    
+    def free_cell(self, cell: Tuple[int, int], reach: int = 3) -> Tuple[int, int]:
+        """Case praticable la plus proche (but ou départ contre un meuble), cell si aucune"""
+        x, y = cell
+        walkable = self.walkable_grid()
+        if not (0 <= x < self.grid_width and 0 <= y < self.grid_height) or walkable[x, y]:
+            return cell
+        x0, y0 = max(0, x - reach), max(0, y - reach)
+        free = np.argwhere(walkable[x0:x + reach + 1, y0:y + reach + 1])
+        if not len(free):
+            return cell
+        nearest = free[np.argmin(((free + (x0 - x, y0 - y)) ** 2).sum(axis=1))]
+        return int(nearest[0] + x0), int(nearest[1] + y0)
+    
+    def snap(self, pos: Tuple[float, float]) -> Tuple[float, float]:
+        """Centre de la case praticable la plus proche si les obstacles sont gonflés, sinon pos"""
+        if self.penalty is None:
+            return pos
+        cell = (int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE))
+        free = self.free_cell(cell)
+        if free == cell:
+            return pos
+        return free[0] * TILE_SIZE + TILE_SIZE//2, free[1] * TILE_SIZE + TILE_SIZE//2
+    
+    def walkable_grid(self) -> np.ndarray:
+        """Grille des cases praticables, indexée [x, y]"""
+        if self._walkable is None:
+            self._walkable = np.array([[self.is_walkable(x, y) for y in range(self.grid_height)]
+                                       for x in range(self.grid_width)], dtype=bool)
+        return self._walkable
+    
+    def build_landmarks(self):
+        """Tables ALT du plan (cache de navigation), calculées sur la grille sans plan compilé.
+        Bornes calculées sans gonflement des obstacles: toujours admissibles en mode --clearance"""
+        navigation = getattr(self.environment, "navigation", None)
+        if navigation is not None:
+            self.landmarks = navigation.landmark_table()
+        else:
+            self.landmarks = LandmarkTable.build(self.walkable_grid())
         
     def is_walkable(self, x: int, y: int) -> bool:
         """Vérifie si une case est praticable"""
@@ -264,92 +908,1235 @@ class PathfindingAStar:
         if x < 0 or x >= self.grid_width or y < 0 or y >= self.grid_height:
             return False
         
+        # Grille précompilée
+        if self._walkable is not None:
+            return bool(self._walkable[x, y])
+        
         px, py = x * TILE_SIZE, y * TILE_SIZE
         
         # Vérifie collision avec obstacles
-        for obstacle in self.environment.obstacles:
+        for obstacle in self.environment.spatial_index.query_point(px, py, Obstacle):
             if obstacle.collides_with_point(px, py):
                 return False
         
         return True
     
     def heuristic(self, x1: int, y1: int, x2: int, y2: int) -> float:
-        """Distance de Manhattan"""
+        """Distance de Manhattan (borne ALT si les landmarks sont calculés)"""
+        if self.landmarks is not None:
+            return self.landmarks.bound(x1, y1, x2, y2)
         return abs(x1 - x2) + abs(y1 - y2)
     
     def get_neighbors(self, node: Node) -> List[Node]:
         """Obtient les voisins d'un noeud"""
         neighbors = []
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), 
-                     (1, 1), (-1, -1), (1, -1), (-1, 1)]  # 8 directions
-        
-        for dx, dy in directions:
+        for dx, dy in DIRECTIONS:
             nx, ny = node.x + dx, node.y + dy
             if self.is_walkable(nx, ny):
-                cost = 1.4 if abs(dx) + abs(dy) == 2 else 1  # Diagonale coûte plus
+                cost = move_cost(dx, dy)
+                if self.penalty is not None:
+                    cost += self.penalty[nx, ny]
                 neighbors.append((Node(nx, ny), cost))
         
         return neighbors
     
     def find_path(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int]) -> List[Tuple[int, int]]:
         """Trouve le chemin optimal avec A*"""
+        start_pos, goal_pos = self.snap(start_pos), self.snap(goal_pos)
+        if self.landmarks is not None:
+            path = self.find_path_bidirectional(start_pos, goal_pos)
+            if path is not None:
+                return path
+        search = self.start_search(start_pos, goal_pos)
+        search.step()
+        self.last_expansions = search.expansions
+        return search.path
+    
+    def find_path_bidirectional(self, start_pos: Tuple[float, float],
+                                goal_pos: Tuple[float, float]) -> Optional[List[Tuple[int, int]]]:
+        """A* bidirectionnel guidé par les landmarks (potentiels moyens)"""
+        start = (int(start_pos[0] // TILE_SIZE), int(start_pos[1] // TILE_SIZE))
+        goal = (int(goal_pos[0] // TILE_SIZE), int(goal_pos[1] // TILE_SIZE))
+        walkable = self.walkable_grid()
+        penalty = self.penalty
+        if not (0 <= start[0] < self.grid_width and 0 <= start[1] < self.grid_height) \
+                or not walkable[start]:
+            return None  # Départ hors grille: A* classique
+        if not (0 <= goal[0] < self.grid_width and 0 <= goal[1] < self.grid_height) \
+                or not walkable[goal]:
+            return []
+        if start == goal:
+            self.last_expansions = 0
+            return [(start[0] * TILE_SIZE + TILE_SIZE//2, start[1] * TILE_SIZE + TILE_SIZE//2)]
+        
+        if self.landmarks.bound(*start, *goal) >= LandmarkTable.UNREACHED / 2:
+            self.last_expansions = 0
+            return []  # Composantes séparées d'après un repère
+        # p_f = (π_but - π_départ) / 2 et p_r = -p_f: clés cohérentes dans les deux sens
+        potential = self.landmarks.potential(start, goal)
+        signs = (1, -1)
+        g = ({start: 0}, {goal: 0})
+        parents = ({start: None}, {goal: None})
+        # Égalités départagées par le g le plus grand (plateaux fréquents sur la grille)
+        heaps = ([(potential(start), 0, start)], [(-potential(goal), 0, goal)])
+        settled = (set(), set())
+        best = float('inf')
+        meeting = None  # (dernier noeud côté départ, premier noeud côté but)
+        expansions = 0
+        
+        while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best:
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            _, neg_g, v = heapq.heappop(heaps[side])
+            gv = -neg_g
+            if v in settled[side]:
+                continue
+            settled[side].add(v)
+            expansions += 1
+            
+            other = g[1 - side]
+            for dx, dy in DIRECTIONS:
+                w = (v[0] + dx, v[1] + dy)
+                if not (0 <= w[0] < self.grid_width and 0 <= w[1] < self.grid_height) or not walkable[w]:
+                    continue
+                cost = move_cost(dx, dy)
+                if penalty is not None:
+                    cost += penalty[w if side == 0 else v]  # Surcoût de la case d'arrivée de l'arête
+                ng = gv + cost
+                if ng < g[side].get(w, float('inf')):
+                    g[side][w] = ng
+                    parents[side][w] = v
+                    heapq.heappush(heaps[side], (ng + signs[side] * potential(w), -ng, w))
+                if w in other and gv + cost + other[w] < best:
+                    best = gv + cost + other[w]
+                    meeting = (v, w) if side == 0 else (w, v)
+        
+        self.last_expansions = expansions
+        if meeting is None:
+            return []
+        cells = []
+        node = meeting[0]
+        while node is not None:
+            cells.append(node)
+            node = parents[0][node]
+        cells.reverse()
+        node = meeting[1]
+        while node is not None:
+            cells.append(node)
+            node = parents[1][node]
+        return [(x * TILE_SIZE + TILE_SIZE//2, y * TILE_SIZE + TILE_SIZE//2) for x, y in cells]
+    
+    def start_search(self, start_pos: Tuple[float, float], goal_pos: Tuple[float, float]) -> 'AStarSearch':
+        """Recherche A* reprenable, à avancer par tranches avec AStarSearch.step"""
+        return AStarSearch(self, self.snap(start_pos), self.snap(goal_pos))
+    
+    def straight_path(self, start_pos: Tuple[float, float], goal_pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Ligne droite si aucune case traversée n'est bloquée, sinon []"""
+        dx = goal_pos[0] - start_pos[0]
+        dy = goal_pos[1] - start_pos[1]
+        steps = int(math.hypot(dx, dy) // (TILE_SIZE / 2)) + 1
+        for k in range(steps + 1):
+            px = start_pos[0] + dx * k / steps
+            py = start_pos[1] + dy * k / steps
+            if not self.is_walkable(int(px // TILE_SIZE), int(py // TILE_SIZE)):
+                return []
+        return [(int(start_pos[0]), int(start_pos[1])), tuple(goal_pos)]
+
+class AStarSearch:
+    """Recherche A* reprenable: open set et noeuds conservés d'une frame à l'autre"""
+    def __init__(self, pathfinder: PathfindingAStar, start_pos: Tuple[float, float],
+                 goal_pos: Tuple[float, float]):
+        self.pathfinder = pathfinder
         start_x = int(start_pos[0] // TILE_SIZE)
         start_y = int(start_pos[1] // TILE_SIZE)
-        goal_x = int(goal_pos[0] // TILE_SIZE)
-        goal_y = int(goal_pos[1] // TILE_SIZE)
+        self.goal_x = int(goal_pos[0] // TILE_SIZE)
+        self.goal_y = int(goal_pos[1] // TILE_SIZE)
         
         start_node = Node(start_x, start_y, g=0)
-        start_node.h = self.heuristic(start_x, start_y, goal_x, goal_y)
-        goal_node = Node(goal_x, goal_y)
+        start_node.h = pathfinder.heuristic(start_x, start_y, self.goal_x, self.goal_y)
         
-        open_set = [start_node]
-        closed_set = set()
-        nodes_dict = {(start_x, start_y): start_node}
+        # Entrées (f, g, noeud): une nouvelle à chaque amélioration, les périmées sont ignorées au pop
+        self.open_set = [(start_node.f, 0, start_node)]
+        self.closed_set = set()
+        self.nodes_dict = {(start_x, start_y): start_node}
         
-        while open_set:
-            current = heapq.heappop(open_set)
+        self.best = start_node  # Noeud développé le plus proche du but
+        self.goal_node: Optional[Node] = None
+        self.done = False
+        self.expansions = 0
+    
+    @property
+    def path(self) -> List[Tuple[int, int]]:
+        """Chemin complet une fois la recherche terminée ([] si aucun)"""
+        return self._to_pixels(self._trace(self.goal_node)) if self.goal_node else []
+    
+    def step(self, max_nodes: Optional[int] = None, max_time: Optional[float] = None) -> bool:
+        """Développe au plus max_nodes noeuds ou max_time secondes, True si terminée"""
+        deadline = time.perf_counter() + max_time if max_time is not None else None
+        expanded = 0
+        pathfinder = self.pathfinder
+        open_set = self.open_set
+        
+        while open_set and not self.done:
+            if max_nodes is not None and expanded >= max_nodes:
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            
+            _, g, current = heapq.heappop(open_set)
+            if g > current.g or (current.x, current.y) in self.closed_set:
+                continue  # Entrée périmée
             
-            if current.x == goal_x and current.y == goal_y:
-                # Reconstruire le chemin
-                path = []
-                while current:
-                    path.append((current.x * TILE_SIZE + TILE_SIZE//2, 
-                               current.y * TILE_SIZE + TILE_SIZE//2))
-                    current = current.parent
-                return path[::-1]
+            if current.x == self.goal_x and current.y == self.goal_y:
+                self.goal_node = current
+                self.done = True
+                return True
             
-            closed_set.add((current.x, current.y))
+            self.closed_set.add((current.x, current.y))
+            expanded += 1
+            self.expansions += 1
+            if (current.h, current.g) < (self.best.h, self.best.g):
+                self.best = current
             
-            for neighbor, cost in self.get_neighbors(current):
-                if (neighbor.x, neighbor.y) in closed_set:
+            for neighbor, cost in pathfinder.get_neighbors(current):
+                if (neighbor.x, neighbor.y) in self.closed_set:
                     continue
                 
                 tentative_g = current.g + cost
                 
-                if (neighbor.x, neighbor.y) not in nodes_dict:
-                    nodes_dict[(neighbor.x, neighbor.y)] = neighbor
-                    neighbor.h = self.heuristic(neighbor.x, neighbor.y, goal_x, goal_y)
+                if (neighbor.x, neighbor.y) not in self.nodes_dict:
+                    self.nodes_dict[(neighbor.x, neighbor.y)] = neighbor
+                    neighbor.h = pathfinder.heuristic(neighbor.x, neighbor.y, self.goal_x, self.goal_y)
                 else:
-                    neighbor = nodes_dict[(neighbor.x, neighbor.y)]
+                    neighbor = self.nodes_dict[(neighbor.x, neighbor.y)]
                 
                 if tentative_g < neighbor.g:
                     neighbor.g = tentative_g
                     neighbor.parent = current
-                    
-                    if neighbor not in open_set:
-                        heapq.heappush(open_set, neighbor)
+                    heapq.heappush(open_set, (neighbor.f, tentative_g, neighbor))
+        
+        self.done = True  # Pas de chemin trouvé si goal_node reste None
+        return True
+    
+    def route(self, from_pos: Tuple[float, float], node: Node) -> List[Tuple[int, int]]:
+        """Chemin dans l'arbre de recherche depuis la case de from_pos jusqu'à node"""
+        current = self.nodes_dict.get((int(from_pos[0] // TILE_SIZE), int(from_pos[1] // TILE_SIZE)))
+        if current is None:
+            return self._to_pixels(self._trace(node))
+        
+        # Remontée jusqu'à l'ancêtre commun (les parents forment un arbre: g décroît)
+        up = []
+        ancestors = {}
+        while current:
+            ancestors[(current.x, current.y)] = len(up)
+            up.append(current)
+            current = current.parent
+        down = []
+        current = node
+        while (current.x, current.y) not in ancestors:
+            down.append(current)
+            current = current.parent
+        return self._to_pixels(up[:ancestors[(current.x, current.y)] + 1] + down[::-1])
+    
+    @staticmethod
+    def _trace(node: Node) -> List[Node]:
+        nodes = []
+        while node:
+            nodes.append(node)
+            node = node.parent
+        return nodes[::-1]
+    
+    @staticmethod
+    def _to_pixels(nodes: List[Node]) -> List[Tuple[int, int]]:
+        return [(node.x * TILE_SIZE + TILE_SIZE//2, node.y * TILE_SIZE + TILE_SIZE//2) for node in nodes]
+
+class PathPlanningPool:
+    """Calcul des chemins A* dans un pool de threads, hors de la boucle de rendu"""
+    def __init__(self, pathfinder: PathfindingAStar, workers: int = 2):
+        self.pathfinder = pathfinder
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="astar")
+        self.pending: Dict[int, Future] = {}  # Agent → requête en cours
+    
+    def submit(self, agent_id: int, start_pos: Tuple[float, float], goal_pos: Tuple[int, int]) -> Future:
+        """Lance une requête (annule la précédente du même agent)"""
+        self.cancel(agent_id)
+        future = self.executor.submit(self.pathfinder.find_path, start_pos, goal_pos)
+        self.pending[agent_id] = future
+        return future
+    
+    def cancel(self, agent_id: int):
+        future = self.pending.pop(agent_id, None)
+        if future is not None:
+            future.cancel()  # Un calcul déjà démarré est simplement ignoré
+    
+    def poll(self) -> List[Tuple[int, List[Tuple[int, int]]]]:
+        """Chemins terminés depuis le dernier appel"""
+        done = [(agent_id, future) for agent_id, future in self.pending.items() if future.done()]
+        results = []
+        for agent_id, future in done:
+            del self.pending[agent_id]
+            if not future.cancelled():
+                results.append((agent_id, future.result()))
+        return results
+    
+    def shutdown(self):
+        for agent_id in list(self.pending):
+            self.cancel(agent_id)
+        self.executor.shutdown(wait=False)
+
+class ReservationTable:
+    """Table de réservation espace-temps: (case, pas de temps) → agent"""
+    def __init__(self, shared_cells: Set[Tuple[int, int]] = ()):
+        self.vertices = {}  # (x, y, t) → agent
+        self.edges = {}  # (x1, y1, x2, y2, t) → agent
+        self.parked = {}  # (x, y) → (agent, t): agent immobile à partir de t
+        self.shared_cells = set(shared_cells)  # Cases partagées (station)
+        self.docking: Set[int] = set()  # Agents partant de ou allant vers une case partagée
+        self.owned = defaultdict(list)
+    
+    def release(self, agent_id: int):
+        """Libère toutes les réservations d'un agent"""
+        for table, key in self.owned.pop(agent_id, []):
+            if table.get(key) == agent_id:
+                del table[key]
+        for cell, (owner, _) in list(self.parked.items()):
+            if owner == agent_id:
+                del self.parked[cell]
+    
+    def reserve(self, agent_id: int, nodes: List[Tuple[int, int, int]], park: bool):
+        """Réserve un chemin espace-temps: case (x, y) atteinte au pas t pour chaque noeud;
+        pendant un déplacement de plusieurs pas, cases de départ et d'arrivée restent occupées"""
+        self.release(agent_id)
+        owned = self.owned[agent_id]
+        
+        def claim(table: dict, key: tuple):
+            table[key] = agent_id
+            owned.append((table, key))
+        
+        if nodes:
+            claim(self.vertices, nodes[0])
+        for (px, py, pt), (x, y, t) in zip(nodes, nodes[1:]):
+            for s in range(pt, t):
+                claim(self.vertices, (px, py, s))
+                claim(self.vertices, (x, y, s + 1))
+                if (px, py) != (x, y):
+                    claim(self.edges, (px, py, x, y, s))
+        if park and nodes and nodes[-1][:2] not in self.shared_cells:
+            self.parked[nodes[-1][:2]] = (agent_id, nodes[-1][2])
+    
+    def is_free(self, agent_id: int, x: int, y: int, t: int) -> bool:
+        owner = self.vertices.get((x, y, t), agent_id)
+        if (x, y) in self.shared_cells and agent_id in self.docking and owner in self.docking:
+            return True  # Station partagée entre agents qui s'y rendent ou en partent, pas avec ceux de passage
+        if owner != agent_id:
+            return False
+        owner, since = self.parked.get((x, y), (agent_id, 0))
+        return owner == agent_id or t < since
+    
+    def can_move(self, agent_id: int, x: int, y: int, nx: int, ny: int, t: int) -> bool:
+        """Refuse les échanges de cases et les croisements en diagonale"""
+        if self.edges.get((nx, ny, x, y, t), agent_id) != agent_id:
+            return False
+        if nx != x and ny != y:
+            if self.edges.get((nx, y, x, ny, t), agent_id) != agent_id:
+                return False
+            if self.edges.get((x, ny, nx, y, t), agent_id) != agent_id:
+                return False
+        return True
+
+class ReverseSearch:
+    """Distance exacte jusqu'au but calculée à la demande (RRA*): A* inverse depuis le but,
+    guidé vers le départ du premier agent, repris jusqu'à fermer chaque case demandée"""
+    def __init__(self, walkable: np.ndarray, goal: Tuple[int, int], origin: Tuple[int, int],
+                 penalty: Optional[np.ndarray] = None):
+        self.walkable = walkable
+        self.penalty = penalty
+        self.origin = origin
+        self.closed: Dict[Tuple[int, int], float] = {}
+        self.g = {goal: 0.0}
+        self.open = [(self._h(goal), 0.0, goal)] if walkable[goal] else []
+    
+    def _h(self, cell: Tuple[int, int]) -> float:
+        dx, dy = abs(cell[0] - self.origin[0]), abs(cell[1] - self.origin[1])
+        return max(dx, dy) + 0.4 * min(dx, dy)
+    
+    def resolve(self, cell: Tuple[int, int], max_nodes: Optional[int] = None,
+                deadline: Optional[float] = None) -> int:
+        """Reprend la recherche jusqu'à fermer cell (au plus max_nodes cases ou jusqu'à l'échéance),
+        renvoie le nombre de cases fermées"""
+        width, height = self.walkable.shape
+        expanded = 0
+        while cell not in self.closed and self.open:
+            if max_nodes is not None and expanded >= max_nodes:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            _, g, v = heapq.heappop(self.open)
+            if v in self.closed:
+                continue
+            self.closed[v] = g
+            expanded += 1
+            enter = self.penalty[v] if self.penalty is not None else 0  # L'arête w → v entre dans v
+            for dx, dy in DIRECTIONS:
+                w = (v[0] + dx, v[1] + dy)
+                if 0 <= w[0] < width and 0 <= w[1] < height and self.walkable[w] and w not in self.closed:
+                    ng = g + move_cost(dx, dy) + enter
+                    if ng < self.g.get(w, float('inf')):
+                        self.g[w] = ng
+                        heapq.heappush(self.open, (ng + self._h(w), ng, w))
+        return expanded
+    
+    def __getitem__(self, cell: Tuple[int, int]) -> float:
+        self.resolve(cell)
+        return self.closed.get(cell, float('inf'))
+
+class CooperativePlanner:
+    """Planification coopérative WHCA*: A* espace-temps sur la grille de tuiles"""
+    def __init__(self, pathfinder: PathfindingAStar, shared_cells: Set[Tuple[int, int]] = (),
+                 window: int = 64, max_expansions: int = 4000, speed: float = 4):
+        self.pathfinder = pathfinder
+        self.window = window
+        self.max_expansions = max_expansions
+        self.reservations = ReservationTable(shared_cells)
+        # Pas de temps dérivé de la vitesse: une case droite en 2 pas, une diagonale en autant de
+        # pas qu'il en faut (3 à la vitesse 4), un waypoint par pas; un agent de la flotte roule
+        # ainsi à la vitesse d'un agent seul (frames par segment: floor(longueur / vitesse) + 1,
+        # un pixel de marge pour l'arrondi des waypoints)
+        self.step_frames = int(TILE_SIZE / 2 // speed) + 1
+        diagonal = 2
+        while int((TILE_SIZE * math.sqrt(2) / diagonal + 1) // speed) + 1 > self.step_frames:
+            diagonal += 1
+        self.durations = {1: 2, 2: diagonal}  # Pas par déplacement, selon |dx| + |dy|
+        
+        self.walkable = pathfinder.walkable_grid()
+        self._distance_maps = {}
+        self.requests: Dict[int, Tuple[float, float]] = {}  # Agent → but, servis dans l'ordre d'arrivée
+        self.search: Optional['CooperativeSearch'] = None  # Recherche de la plus ancienne demande
+    
+    def _moves(self, x: int, y: int):
+        penalty = self.pathfinder.penalty
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.pathfinder.grid_width and 0 <= ny < self.pathfinder.grid_height \
+                    and self.walkable[nx, ny]:
+                yield nx, ny, move_cost(dx, dy) + (penalty[nx, ny] if penalty is not None else 0)
+    
+    def distance_map(self, goal: Tuple[int, int], origin: Tuple[int, int]):
+        """Distance exacte jusqu'au but indexée [x, y] (recherche inverse reprenable, ou carte
+        complète précalculée pour la station), heuristique de WHCA*"""
+        if goal not in self._distance_maps:
+            self._distance_maps[goal] = ReverseSearch(self.walkable, goal, origin, self.pathfinder.penalty)
+        return self._distance_maps[goal]
+    
+    def request(self, agent_id: int, start_pos: Tuple[float, float], goal_pos: Tuple[float, float],
+                clock: int):
+        """Demande de chemin servie par run() dans le budget de la frame; l'agent attend sur sa case"""
+        self.requests.pop(agent_id, None)
+        if self.search is not None and self.search.agent_id == agent_id:
+            self.search = None
+        self.requests[agent_id] = goal_pos
+        x, y = int(start_pos[0] // TILE_SIZE), int(start_pos[1] // TILE_SIZE)
+        self.reservations.reserve(agent_id, [(x, y, -(-clock // self.step_frames))], park=True)
+    
+    def cancel(self, agent_id: int):
+        self.requests.pop(agent_id, None)
+        if self.search is not None and self.search.agent_id == agent_id:
+            self.search = None
+        self.reservations.release(agent_id)
+    
+    def run(self, fleet: 'Fleet', deadline: float, force: bool = False):
+        """Avance les recherches en attente, une à la fois dans l'ordre d'arrivée, jusqu'à l'échéance;
+        si force, au moins une tranche de SEARCH_NODES_PER_TICK noeuds (pas de famine)"""
+        while self.requests:
+            now = time.perf_counter()
+            if not force and now >= deadline:
+                return
+            agent_id = next(iter(self.requests))
+            if self.search is None or self.search.agent_id != agent_id:
+                self.search = CooperativeSearch(self, agent_id, (fleet.x[agent_id], fleet.y[agent_id]),
+                                                self.requests[agent_id], fleet.clock)
+            done = self.search.step(SEARCH_NODES_PER_TICK) if force else self.search.step(max_time=deadline - now)
+            force = False
+            if not done:
+                continue
+            result = self.search.result(fleet.clock)
+            self.search = None
+            if result is None:
+                continue  # Finie trop tard pour son créneau: relancée depuis maintenant
+            del self.requests[agent_id]
+            path, t0, replan_index = result
+            fleet.set_path(agent_id, path, t0, replan_index)
+            if path:
+                fleet.agents[agent_id].state = AgentState.MOVING
+            else:
+                fleet.route_failed(agent_id)
+    
+    def _descend(self, node: Tuple[int, int, int], dist: np.ndarray) -> List[Tuple[int, int, int]]:
+        """Complète le chemin hors fenêtre en suivant le champ de distance"""
+        nodes = []
+        x, y, t = node
+        while dist[x, y] > 0:
+            nx, ny, _ = min(self._moves(x, y), key=lambda m: m[2] + dist[m[0], m[1]])
+            t += self.durations[abs(nx - x) + abs(ny - y)]
+            x, y = nx, ny
+            nodes.append((x, y, t))
+        return nodes
+    
+    def can_go(self, agent_id: int, x: int, y: int, nx: int, ny: int, t: int, d: int) -> bool:
+        """Déplacement (ou attente) de d pas libre: arrivée et transition à chaque pas,
+        case de départ occupée jusqu'à la fin du déplacement"""
+        reservations = self.reservations
+        return all(reservations.is_free(agent_id, nx, ny, t + k) and
+                   reservations.can_move(agent_id, x, y, nx, ny, t + k - 1) and
+                   (k == d or reservations.is_free(agent_id, x, y, t + k)) for k in range(1, d + 1))
+    
+    def _to_pixels(self, nodes: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+        """Un waypoint par pas de temps: attente répétée, déplacement découpé régulièrement"""
+        waypoints = []
+        for k, (x, y, t) in enumerate(nodes):
+            cx, cy = x * TILE_SIZE + TILE_SIZE//2, y * TILE_SIZE + TILE_SIZE//2
+            if k == 0:
+                waypoints.append((cx, cy))
+                continue
+            px, py, pt = nodes[k - 1]
+            px, py = px * TILE_SIZE + TILE_SIZE//2, py * TILE_SIZE + TILE_SIZE//2
+            d = t - pt
+            waypoints.extend((int(round(px + (cx - px) * i / d)), int(round(py + (cy - py) * i / d)))
+                             for i in range(1, d + 1))
+        return waypoints
+
+class CooperativeSearch:
+    """Recherche WHCA* reprenable: A* espace-temps avancé par tranches comme AStarSearch
+    (la recherche inverse qui donne l'heuristique du départ compte dans le budget)"""
+    def __init__(self, planner: CooperativePlanner, agent_id: int, start_pos: Tuple[float, float],
+                 goal_pos: Tuple[float, float], clock: int):
+        self.planner = planner
+        self.agent_id = agent_id
+        start_pos, goal_pos = planner.pathfinder.snap(start_pos), planner.pathfinder.snap(goal_pos)
+        self.start = (int(start_pos[0] // TILE_SIZE), int(start_pos[1] // TILE_SIZE))
+        self.goal = (int(goal_pos[0] // TILE_SIZE), int(goal_pos[1] // TILE_SIZE))
+        self.t0 = -(-clock // planner.step_frames)
+        reservations = planner.reservations
+        if self.start in reservations.shared_cells or self.goal in reservations.shared_cells:
+            reservations.docking.add(agent_id)
+        else:
+            reservations.docking.discard(agent_id)
+        self.dist = planner.distance_map(self.goal, self.start)
+        
+        self.open_set: Optional[list] = None  # Ouvert une fois la distance du départ connue
+        self.parents = {}
+        self.best_g = {}
+        self.end: Optional[Tuple[int, int, int]] = None
+        self.expansions = 0
+    
+    def step(self, max_nodes: Optional[int] = None, max_time: Optional[float] = None) -> bool:
+        """Développe au plus max_nodes noeuds ou max_time secondes, True si terminée"""
+        deadline = time.perf_counter() + max_time if max_time is not None else None
+        planner = self.planner
+        dist = self.dist
+        expanded = 0
+        
+        if self.open_set is None:
+            if isinstance(dist, ReverseSearch):
+                expanded += dist.resolve(self.start, max_nodes, deadline)
+                if self.start not in dist.closed and dist.open:
+                    return False
+            if not np.isfinite(dist[self.start]):
+                return True
+            x, y = self.start
+            self.open_set = [(dist[x, y], 0, x, y, self.t0)]
+            self.parents = {(x, y, self.t0): None}
+            self.best_g = {(x, y, self.t0): 0}
+        
+        open_set, best_g = self.open_set, self.best_g
+        horizon = self.t0 + planner.window
+        while open_set and self.expansions < planner.max_expansions:
+            if max_nodes is not None and expanded >= max_nodes:
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            f, g, x, y, t = heapq.heappop(open_set)
+            if g > best_g[(x, y, t)]:
+                continue
+            if (x, y) == self.goal or t >= horizon:
+                self.end = (x, y, t)
+                break
+            if isinstance(dist, ReverseSearch):
+                # Heuristique des voisins résolue dans le budget, sinon noeud remis pour la tranche suivante
+                for nx, ny, _ in planner._moves(x, y):
+                    remaining = max_nodes - expanded if max_nodes is not None else None
+                    expanded += dist.resolve((nx, ny), remaining, deadline)
+                    if (nx, ny) not in dist.closed and dist.open:
+                        heapq.heappush(open_set, (f, g, x, y, t))
+                        return False
+            expanded += 1
+            self.expansions += 1
+            
+            # Attente d'un pas (coût d'un demi-déplacement droit) ou déplacement de plusieurs pas
+            for nx, ny, cost in [(x, y, 0.5)] + list(planner._moves(x, y)):
+                d = planner.durations.get(abs(nx - x) + abs(ny - y), 1)
+                key = (nx, ny, t + d)
+                ng = g + cost
+                if ng >= best_g.get(key, float('inf')):
+                    continue
+                if not planner.can_go(self.agent_id, x, y, nx, ny, t, d):
+                    continue
+                best_g[key] = ng
+                self.parents[key] = (x, y, t)
+                heapq.heappush(open_set, (ng + dist[nx, ny], ng, nx, ny, t + d))
+        return True
+    
+    def result(self, clock: int) -> Optional[Tuple[List[Tuple[int, int]], int, int]]:
+        """Chemin réservé: (waypoints, pas de départ, index de replanification). Une recherche
+        finie après son pas de départ est décalée (attente sur place) si elle reste libre, None sinon"""
+        planner = self.planner
+        reservations = planner.reservations
+        now = -(-clock // planner.step_frames)
+        if self.open_set is None:
+            reservations.release(self.agent_id)  # But inaccessible
+            return [], now, 0
+        if self.end is None:
+            # Bloqué: attendre un pas puis réessayer
+            nodes = [(self.start[0], self.start[1], now + k) for k in range(3)]
+            reservations.reserve(self.agent_id, nodes, park=False)
+            return planner._to_pixels(nodes), now, 2
+        
+        nodes = []
+        node = self.end
+        while node is not None:
+            nodes.append(node)
+            node = self.parents[node]
+        nodes.reverse()
+        shift = max(0, now - self.t0)
+        if shift:
+            nodes = [(x, y, t + shift) for x, y, t in nodes]
+            if not all(planner.can_go(self.agent_id, a[0], a[1], b[0], b[1], a[2], b[2] - a[2])
+                       for a, b in zip(nodes, nodes[1:])):
+                return None
+        t0 = self.t0 + shift
+        reached = nodes[-1][:2] == self.goal
+        reservations.reserve(self.agent_id, nodes, park=reached)
+        if reached:
+            return planner._to_pixels(nodes), t0, 0
+        # Fenêtre épuisée: fin du chemin non réservée, replanification au premier centre de
+        # case passé la mi-fenêtre
+        replan_index = next(t - t0 for _, _, t in nodes if t - t0 >= planner.window // 2)
+        return planner._to_pixels(nodes + planner._descend(nodes[-1], self.dist)), t0, replan_index
+
+# Navigation par quadtree
+
+def triarea2(a: Tuple[float, float], b: Tuple[float, float], c: Tuple[float, float]) -> float:
+    return (c[0] - a[0]) * (b[1] - a[1]) - (b[0] - a[0]) * (c[1] - a[1])
+
+class QuadCell:
+    """Feuille libre du quadtree (carré sans obstacle)"""
+    __slots__ = ("x", "y", "width", "height", "index", "portals")
+    
+    def __init__(self, x: int, y: int, size: int, index: int):
+        self.x = x
+        self.y = y
+        self.width = self.height = size
+        self.index = index
+        self.portals: List[Tuple['QuadCell', Tuple[float, float], Tuple[float, float]]] = []
+    
+    def contains_point(self, x: float, y: float) -> bool:
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+class QuadtreeNavMesh:
+    """Décomposition adaptative de l'espace libre: grandes cellules dans les zones ouvertes,
+    cellules fines le long des obstacles. A* sur le graphe des portails (côtés partagés
+    entre feuilles), puis lissage par entonnoir en waypoints pixel. Avec un rayon, quadtree
+    de l'espace des configurations: obstacles et murs gonflés, toute feuille à au moins
+    ce rayon d'un meuble, chemins au rayon du robot sans autre vérification."""
+    def __init__(self, width: int, height: int, obstacles: List[Obstacle],
+                 min_size: int = TILE_SIZE // 2, margin: int = TILE_SIZE // 2, radius: int = 0):
+        self.width = width
+        self.height = height
+        self.min_size = min_size
+        self.margin = margin  # Distance gardée aux extrémités des portails (coins d'obstacles)
+        self.root_size = min_size
+        while self.root_size < max(width, height):
+            self.root_size *= 2
+        self.cells: List[QuadCell] = []
+        self.index = SpatialIndex()
+        self.last_expansions = 0
+        if radius:
+            obstacles = [Obstacle(o.x - radius, o.y - radius, o.width + 2 * radius, o.height + 2 * radius, o.name)
+                         for o in obstacles]
+            obstacles += [Obstacle(0, 0, width, radius, "Mur"), Obstacle(0, height - radius, width, radius, "Mur"),
+                          Obstacle(0, 0, radius, height, "Mur"), Obstacle(width - radius, 0, radius, height, "Mur")]
+        self._build(obstacles)
+        self._link()
+    
+    def _build(self, obstacles: List[Obstacle]):
+        def overlaps(r, x, y, size):
+            return r.x < x + size and x < r.x + r.width and r.y < y + size and y < r.y + r.height
+        
+        def covers(r, x, y, size):
+            return r.x <= x and x + size <= r.x + r.width and r.y <= y and y + size <= r.y + r.height
+        
+        # Chaque cellule ne teste que les rectangles qui chevauchent sa mère
+        stack = [(0, 0, self.root_size, list(obstacles))]
+        while stack:
+            x, y, size, obstacles = stack.pop()
+            if x >= self.width or y >= self.height:
+                continue
+            obstacles = [o for o in obstacles if overlaps(o, x, y, size)]
+            inside = x + size <= self.width and y + size <= self.height
+            if inside and not obstacles:
+                cell = QuadCell(x, y, size, len(self.cells))
+                self.cells.append(cell)
+                self.index.insert(cell)
+            elif size > self.min_size and not any(covers(o, x, y, size) for o in obstacles):
+                half = size // 2
+                for dx, dy in ((0, 0), (half, 0), (0, half), (half, half)):
+                    stack.append((x + dx, y + dy, half, obstacles))
+            # Sinon: cellule entièrement couverte, ou minimale et partiellement couverte (bloquée)
+    
+    def _link(self):
+        """Portails entre feuilles qui partagent un morceau de côté"""
+        by_left = defaultdict(list)  # x du côté gauche → cellules triées par y
+        by_top = defaultdict(list)
+        for cell in self.cells:
+            by_left[cell.x].append(cell)
+            by_top[cell.y].append(cell)
+        for column in by_left.values():
+            column.sort(key=lambda c: c.y)
+        for row in by_top.values():
+            row.sort(key=lambda c: c.x)
+        starts_y = {x: [c.y for c in column] for x, column in by_left.items()}
+        starts_x = {y: [c.x for c in row] for y, row in by_top.items()}
+        
+        for cell in self.cells:
+            right = cell.x + cell.width
+            column = by_left.get(right, [])
+            k = max(0, bisect.bisect_right(starts_y.get(right, []), cell.y) - 1)
+            while k < len(column) and column[k].y < cell.y + cell.height:
+                other = column[k]
+                y0, y1 = max(cell.y, other.y), min(cell.y + cell.height, other.y + other.height)
+                if y1 > y0:
+                    self._connect(cell, other, (right, y0), (right, y1))
+                k += 1
+            bottom = cell.y + cell.height
+            row = by_top.get(bottom, [])
+            k = max(0, bisect.bisect_right(starts_x.get(bottom, []), cell.x) - 1)
+            while k < len(row) and row[k].x < cell.x + cell.width:
+                other = row[k]
+                x0, x1 = max(cell.x, other.x), min(cell.x + cell.width, other.x + other.width)
+                if x1 > x0:
+                    self._connect(cell, other, (x0, bottom), (x1, bottom))
+                k += 1
+    
+    @staticmethod
+    def _connect(a: QuadCell, b: QuadCell, p: Tuple[float, float], q: Tuple[float, float]):
+        a.portals.append((b, p, q))
+        b.portals.append((a, p, q))
+    
+    def locate(self, x: float, y: float) -> Optional[QuadCell]:
+        """Feuille contenant le point, sinon la plus proche"""
+        for cell in self.index.query_point(x, y, QuadCell):
+            if cell.contains_point(x, y):
+                return cell
+        return self.index.nearest(x, y, QuadCell)
+    
+    def _clamp(self, cell: QuadCell, pos: Tuple[float, float]) -> Tuple[float, float]:
+        inset = min(self.margin, cell.width / 2)
+        return (min(max(pos[0], cell.x + inset), cell.x + cell.width - inset),
+                min(max(pos[1], cell.y + inset), cell.y + cell.height - inset))
+    
+    def _shrink(self, p: Tuple[float, float], q: Tuple[float, float]) -> Tuple[tuple, tuple]:
+        length = math.hypot(q[0] - p[0], q[1] - p[1])
+        if length <= 2 * self.margin:
+            mid = ((p[0] + q[0]) / 2, (p[1] + q[1]) / 2)
+            return mid, mid
+        ux, uy = (q[0] - p[0]) / length * self.margin, (q[1] - p[1]) / length * self.margin
+        return (p[0] + ux, p[1] + uy), (q[0] - ux, q[1] - uy)
+    
+    def corridor(self, start: QuadCell, goal: QuadCell, start_pos: Tuple[float, float],
+                 goal_pos: Tuple[float, float]) -> Optional[List[Tuple[QuadCell, tuple, tuple]]]:
+        """A* sur les feuilles (coût via les milieux de portails): portails traversés"""
+        g = {start: 0.0}
+        entry = {start: start_pos}
+        came_from = {start: None}
+        open_set = [(0.0, 0, start)]
+        closed = set()
+        counter = 1
+        self.last_expansions = 0
+        while open_set:
+            _, _, cell = heapq.heappop(open_set)
+            if cell is goal:
+                portals = []
+                while came_from[cell] is not None:
+                    previous, p, q = came_from[cell]
+                    portals.append((previous, p, q))
+                    cell = previous
+                return portals[::-1]
+            if cell in closed:
+                continue
+            closed.add(cell)
+            self.last_expansions += 1
+            ex, ey = entry[cell]
+            for other, p, q in cell.portals:
+                mid = ((p[0] + q[0]) / 2, (p[1] + q[1]) / 2)
+                cost = g[cell] + math.hypot(mid[0] - ex, mid[1] - ey)
+                if cost < g.get(other, float('inf')):
+                    g[other] = cost
+                    entry[other] = mid
+                    came_from[other] = (cell, p, q)
+                    h = math.hypot(goal_pos[0] - mid[0], goal_pos[1] - mid[1])
+                    heapq.heappush(open_set, (cost + h, counter, other))
+                    counter += 1
+        return None
+    
+    def find_path(self, start_pos: Tuple[float, float], goal_pos: Tuple[float, float]) -> List[Tuple[int, int]]:
+        """Waypoints pixel du départ au but (même format que PathfindingAStar.find_path).
+        Départ ou but hors des feuilles (contre un meuble): ramené dans la feuille la plus proche"""
+        start = self.locate(*start_pos)
+        goal = self.locate(*goal_pos)
+        if start is None or goal is None:
+            return []
+        begin = (int(start_pos[0]), int(start_pos[1]))
+        origin = begin if start.contains_point(*start_pos) else self._clamp(start, start_pos)
+        end = self._clamp(goal, goal_pos)
+        portals = self.corridor(start, goal, origin, end)
+        if portals is None:
+            return []
+        
+        # Côtés gauche/droit de chaque portail dans le sens de la marche
+        funnel = [(origin, origin)]
+        for cell, p, q in portals:
+            p, q = self._shrink(p, q)
+            cx, cy = cell.x + cell.width / 2, cell.y + cell.height / 2
+            funnel.append((p, q) if triarea2((cx, cy), p, q) > 0 else (q, p))
+        funnel.append((end, end))
+        corners = self._string_pull(funnel)
+        if origin != begin:
+            corners.insert(0, origin)
+        return [begin] + [(int(round(x)), int(round(y))) for x, y in corners]
+    
+    @staticmethod
+    def _string_pull(portals: List[Tuple[tuple, tuple]]) -> List[Tuple[float, float]]:
+        """Algorithme de l'entonnoir: plus court chemin à travers la suite de portails"""
+        apex = left = right = portals[0][0]
+        apex_index = left_index = right_index = 0
+        points = []
+        i = 1
+        while i < len(portals):
+            new_left, new_right = portals[i]
+            # Resserre le côté droit
+            if triarea2(apex, right, new_right) <= 0:
+                if apex == right or triarea2(apex, left, new_right) > 0:
+                    right, right_index = new_right, i
+                else:
+                    points.append(left)
+                    apex, apex_index = left, left_index
+                    left = right = apex
+                    left_index = right_index = apex_index
+                    i = apex_index + 1
+                    continue
+            # Resserre le côté gauche
+            if triarea2(apex, left, new_left) >= 0:
+                if apex == left or triarea2(apex, right, new_left) < 0:
+                    left, left_index = new_left, i
+                else:
+                    points.append(right)
+                    apex, apex_index = right, right_index
+                    left = right = apex
+                    left_index = right_index = apex_index
+                    i = apex_index + 1
+                    continue
+            i += 1
+        points.append(portals[-1][0])
+        return points
+    
+    def straight_path(self, start_pos: Tuple[float, float], goal_pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Ligne droite si départ et but sont dans la même feuille (convexe), sinon []"""
+        cell = self.locate(*start_pos)
+        if cell is not None and cell.contains_point(*start_pos) and cell.contains_point(*goal_pos):
+            return [(int(start_pos[0]), int(start_pos[1])), tuple(goal_pos)]
+        return []
+
+# Automate à états finis (codes stockés dans la flotte)
+FSM_STATES = ("waiting", "moving", "cleaning", "returning", "emptying", "charging", "manual")
+FSM_WAITING, FSM_MOVING, FSM_CLEANING, FSM_RETURNING, FSM_EMPTYING, FSM_CHARGING, FSM_MANUAL = range(len(FSM_STATES))
+AGENT_STATES = tuple(AgentState)
+STATE_MOVING = AGENT_STATES.index(AgentState.MOVING)
+STATE_RETURNING = AGENT_STATES.index(AgentState.RETURNING)
+
+class FleetField:
+    """Attribut d'agent stocké dans un tableau NumPy de la flotte"""
+    def __init__(self, cast=float, values: Tuple = None):
+        self.cast = cast
+        self.values = values
+        self.codes = {value: code for code, value in enumerate(values)} if values else None
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        value = getattr(agent.fleet, self.name)[agent.index]
+        if self.values is not None:
+            return self.values[value]
+        return self.cast(value)
+    
+    def __set__(self, agent, value):
+        if self.codes is not None:
+            value = self.codes[value]
+        getattr(agent.fleet, self.name)[agent.index] = value
+
+class Fleet:
+    """Flotte d'aspirateurs: état en structure de tableaux, mis à jour en bloc"""
+    FLOAT_FIELDS = ("x", "y", "angle", "speed", "battery", "dirt_level",
+                    "cleaning_progress", "charging_progress", "emptying_progress",
+                    "total_distance", "time_cleaning", "wp_x", "wp_y")
+    INT_FIELDS = ("state", "fsm_state", "path_index", "path_len", "total_cleanings",
+                  "path_t0", "replan_index")
+    BOOL_FIELDS = ("manual_mode", "path_partial")
+    
+    def __init__(self, capacity: int = 8, policy: Optional[Policy] = None):
+        self.size = 0
+        self.capacity = max(1, capacity)
+        self.policy = policy if policy is not None else Policy()
+        for name in self.FLOAT_FIELDS:
+            setattr(self, name, np.zeros(self.capacity))
+        for name in self.INT_FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.int64))
+        for name in self.BOOL_FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=bool))
+        self.agents: List['VacuumAgent'] = []
+        self.paths: List[List[Tuple[int, int]]] = []
+        self.claims: Set[Room] = set()  # Pièces déjà attribuées à un agent
+        self.unreachable: Set[Room] = set()  # Pièces sans chemin, écartées jusqu'au changement de plan
+        self.searches: Dict[int, AStarSearch] = {}  # Recherches A* découpées en cours
+        self.effects = True  # Particules visuelles (inutiles sans affichage)
+        self.clock = 0  # Frames écoulées (chemins coopératifs indexés par le temps)
+        self.step_frames = 1
+    
+    def __len__(self):
+        return self.size
+    
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.FLOAT_FIELDS + self.INT_FIELDS + self.BOOL_FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+    
+    def allocate(self, agent: 'VacuumAgent') -> int:
+        """Réserve une ligne pour un nouvel agent"""
+        if self.size == self.capacity:
+            self._grow()
+        index = self.size
+        self.size += 1
+        self.agents.append(agent)
+        self.paths.append([])
+        return index
+    
+    def spawn(self, start_pos: Tuple[int, int], pathfinder: 'PathfindingAStar') -> 'VacuumAgent':
+        return VacuumAgent(start_pos, pathfinder, self)
+    
+    def set_path(self, index: int, path: List[Tuple[int, int]], t0: int = -1, replan_index: int = 0,
+                 partial: bool = False):
+        """Nouveau chemin; t0 >= 0 pour un chemin coopératif (waypoint k au pas t0 + k)"""
+        self.paths[index] = path
+        self.path_len[index] = len(path)
+        self.path_t0[index] = t0
+        self.replan_index[index] = replan_index
+        self.path_partial[index] = partial
+        self.set_path_index(index, 0)
+    
+    def set_path_index(self, index: int, path_index: int):
+        self.path_index[index] = path_index
+        if path_index < self.path_len[index]:
+            self.wp_x[index], self.wp_y[index] = self.paths[index][path_index]
+    
+    def needs_maintenance(self, idx: np.ndarray) -> np.ndarray:
+        return ((self.battery[idx] < self.policy.maintenance_battery)
+                | (self.dirt_level[idx] >= MAX_DIRT_CAPACITY * self.policy.maintenance_bin))
+    
+    def update(self, dt: float, idx: np.ndarray) -> np.ndarray:
+        """Avance les agents idx le long de leur chemin, renvoie ceux arrivés au bout"""
+        arrived = np.zeros(len(idx), dtype=bool)
+        if len(idx) == 0:
+            return arrived
+        self.angle[idx] = (self.angle[idx] + 3) % 360
+        
+        state = self.state[idx]
+        moving = (((state == STATE_MOVING) | (state == STATE_RETURNING))
+                  & (self.path_index[idx] < self.path_len[idx]))
+        sel = idx[moving]
+        if len(sel):
+            # Chemins coopératifs: pas de départ vers le waypoint k avant le pas t0 + k - 1
+            t0 = self.path_t0[sel]
+            ready = (t0 < 0) | (self.clock >= (t0 + self.path_index[sel] - 1) * self.step_frames)
+            dx = self.wp_x[sel] - self.x[sel]
+            dy = self.wp_y[sel] - self.y[sel]
+            dist = np.sqrt(dx*dx + dy*dy)
+            speed = self.speed[sel]
+            reach = (dist < speed) & ready
+            
+            go = ready & ~reach
+            step = sel[go]
+            self.x[step] += (dx[go] / dist[go]) * speed[go]
+            self.y[step] += (dy[go] / dist[go]) * speed[go]
+            self.total_distance[step] += speed[go] * dt
+            
+            hit = sel[reach]
+            self.x[hit] = self.wp_x[hit]
+            self.y[hit] = self.wp_y[hit]
+            self.path_index[hit] += 1
+            done = reach.copy()
+            # Chemin partiel: l'agent attend la suite au bout du chemin
+            done[reach] = (self.path_index[hit] >= self.path_len[hit]) & ~self.path_partial[hit]
+            for i in sel[reach & ~done]:
+                if 0 < self.replan_index[i] <= self.path_index[i]:
+                    self.agents[i].replan()
+                else:
+                    self.set_path_index(i, self.path_index[i])
+            
+            # Pas de décharge sur la dernière étape (comme un agent seul)
+            drain = sel[~done]
+            self.battery[drain] = np.maximum(0, self.battery[drain] - BATTERY_DRAIN_MOVE * dt)
+            arrived[moving] = done
+        
+        if self.effects:
+            for i in idx[~arrived]:
+                self.agents[i].update_particles(dt)
+        return arrived
+    
+    def follow_search(self, index: int):
+        """Chemin de l'agent vers le meilleur noeud de sa recherche A* en cours"""
+        search = self.searches[index]
+        agent = self.agents[index]
+        path = agent.current_path
+        if self.path_index[index] < len(path):
+            from_pos = path[self.path_index[index]]  # Waypoint visé
+        else:
+            from_pos = (agent.x, agent.y)
+        
+        if search.done:
+            del self.searches[index]
+            if search.goal_node is None:
+                self.route_failed(index)
+                return
+        self.set_path(index, search.route(from_pos, search.goal_node or search.best),
+                      partial=not search.done)
+        if len(path) == 0 and self.path_len[index]:
+            agent.state = AgentState.MOVING
+    
+    def step_searches(self):
+        """Avance chaque recherche A* d'une tranche bornée"""
+        for index, search in list(self.searches.items()):
+            best = search.best
+            if search.step(SEARCH_NODES_PER_TICK, SEARCH_TIME_PER_TICK) or search.best is not best:
+                self.follow_search(index)
+    
+    def update_cleaning(self, dt: float, idx: np.ndarray, rooms: List[Room]) -> np.ndarray:
+        dirt_values = np.array([room.get_dirt_value() for room in rooms], dtype=float)
+        cleaning_time = CLEANING_BASE_TIME * (1 + dirt_values)
+        self.cleaning_progress[idx] += dt / cleaning_time
+        
+        drain = BATTERY_DRAIN_CLEAN_BASE * (1 + dirt_values * 0.5)
+        self.battery[idx] = np.maximum(0, self.battery[idx] - drain * dt)
+        self.dirt_level[idx] = np.minimum(MAX_DIRT_CAPACITY,
+                                          self.dirt_level[idx] + DIRT_PER_CLEAN * dt / cleaning_time)
+        self.time_cleaning[idx] += dt
+        
+        if self.effects:
+            for i in idx:
+                self.agents[i].emit_suction_particles()
+        return self.cleaning_progress[idx] >= 1.0
+    
+    def update_charging(self, dt: float, idx: np.ndarray) -> np.ndarray:
+        self.battery[idx] = np.minimum(MAX_BATTERY, self.battery[idx] + CHARGING_RATE * dt)
+        self.charging_progress[idx] = self.battery[idx] / MAX_BATTERY
+        return self.battery[idx] >= MAX_BATTERY
+    
+    def update_emptying(self, dt: float, idx: np.ndarray) -> np.ndarray:
+        self.emptying_progress[idx] += dt / EMPTYING_TIME
+        self.dirt_level[idx] = np.maximum(0, self.dirt_level[idx] - (MAX_DIRT_CAPACITY * dt / EMPTYING_TIME))
+        return self.emptying_progress[idx] >= 1.0
+    
+    def update_idle(self, dt: float):
+        """Animation des agents que run_fsm n'a pas déjà avancés (en route, y compris
+        en attente de chemin) et qui ne nettoient pas"""
+        n = self.size
+        state, fsm = self.state[:n], self.fsm_state[:n]
+        routed = ~self.manual_mode[:n] & ((fsm == FSM_MOVING) | (fsm == FSM_RETURNING))
+        busy = routed | (state == STATE_MOVING) | (state == STATE_RETURNING) | \
+               (state == AGENT_STATES.index(AgentState.CLEANING))
+        self.update(dt, np.flatnonzero(~busy))
+    
+    def set_manual(self, agent: 'VacuumAgent', enabled: bool):
+        """Bascule un agent en mode manuel (libère sa pièce cible)"""
+        agent.manual_mode = enabled
+        self.claims.discard(agent.target_room)
+        if agent.path_pool is not None:
+            agent.path_pool.cancel(agent.index)
+        self.searches.pop(agent.index, None)
+        if agent.planner is not None:
+            agent.planner.cancel(agent.index)
+        if enabled:
+            agent.current_action = "🎮 Mode manuel activé"
+            agent.fsm_state = "manual"
+        else:
+            agent.current_action = "🤖 Mode automatique"
+            agent.fsm_state = "waiting"
+    
+    def _assign_next(self, agent: 'VacuumAgent', environment: 'Environment', label: str) -> bool:
+        """Envoie l'agent vers la pièce prioritaire non attribuée"""
+        target = agent.priorities.best(self.claims | self.unreachable if self.unreachable else self.claims)
+        if target is None:
+            return False
+        agent.learn_room_pattern(target)
+        agent.current_action = label.format(target=target)
+        self.claims.add(target)
+        agent.fsm_state = "moving"
+        agent.move_to(target.center, target)  # Peut échouer tout de suite (route_failed)
+        return True
+    
+    def _return_to_station(self, agent: 'VacuumAgent', station: ChargingStation, action: str):
+        agent.current_action = action
+        agent.fsm_state = "returning"
+        agent.return_to_station(station.center)
+    
+    def route_failed(self, index: int):
+        """Aucun chemin jusqu'à la cible: pièce rendue et écartée, agent de nouveau en attente
+        pour que _assign_next en choisisse une autre"""
+        agent = self.agents[index]
+        self.set_path(index, [])
+        if agent.manual_mode:
+            return
+        if agent.fsm_state == "moving" and agent.target_room is not None:
+            self.claims.discard(agent.target_room)
+            self.unreachable.add(agent.target_room)
+        self._rest(agent, "⛔ Cible inaccessible")
+    
+    def _rest(self, agent: 'VacuumAgent', action: str):
+        agent.current_action = action
+        agent.state = AgentState.IDLE
+        agent.fsm_state = "waiting"
+    
+    def _start_charging_or_rest(self, agent: 'VacuumAgent', action: str):
+        if agent.battery < self.policy.charge_threshold:
+            agent.current_action = "🔋 Recharge..."
+            agent.start_charging()
+            agent.fsm_state = "charging"
+        else:
+            self._rest(agent, action)
+    
+    def run_fsm(self, environment: 'Environment', dt: float, elapsed_time: float):
+        """Automate à états finis, avancé pour toute la flotte à la fois"""
+        self.clock += 1
+        # Chemins coopératifs: demandes en attente d'abord, celles de la frame ensuite, dans un
+        # budget de temps commun (la plus ancienne est toujours servie: pas de famine)
+        planner = environment.planner
+        deadline = time.perf_counter() + COOP_TIME_PER_TICK
+        if planner is not None:
+            planner.run(self, deadline, force=True)
+        if environment.path_pool is not None:
+            for i, path in environment.path_pool.poll():
+                agent = self.agents[i]
+                if path:
+                    agent.current_path = path
+                    agent.state = AgentState.MOVING
+                else:
+                    self.route_failed(i)
+        self.step_searches()
+        n = self.size
+        fsm = self.fsm_state[:n]
+        auto = ~self.manual_mode[:n]
+        station = environment.station
+        waiting = np.flatnonzero(auto & (fsm == FSM_WAITING))
+        moving = np.flatnonzero(auto & (fsm == FSM_MOVING))
+        cleaning = np.flatnonzero(auto & (fsm == FSM_CLEANING))
+        returning = np.flatnonzero(auto & (fsm == FSM_RETURNING))
+        emptying = np.flatnonzero(auto & (fsm == FSM_EMPTYING))
+        charging = np.flatnonzero(auto & (fsm == FSM_CHARGING))
+        
+        # Mises à jour vectorisées
+        moved = moving[self.update(dt, moving)]
+        cleaned = cleaning[self.update_cleaning(dt, cleaning, [self.agents[i].target_room for i in cleaning])]
+        returned = returning[self.update(dt, returning)]
+        emptied = emptying[self.update_emptying(dt, emptying)]
+        charged = charging[self.update_charging(dt, charging)]
+        
+        # Transitions (seulement les agents concernés)
+        for i, maintenance in zip(waiting, self.needs_maintenance(waiting)):
+            agent = self.agents[i]
+            if maintenance:
+                self._return_to_station(agent, station, "⚠️ Maintenance → Station")
+            elif not self._assign_next(agent, environment, "Cible: {target.name} (niveau {target.dirt_level.value})"):
+                agent.current_action = "Surveillance → Tout propre ✓"
+        
+        for i in moved:
+            agent = self.agents[i]
+            agent.current_action = f"Nettoyage de {agent.target_room.name}..."
+            agent.start_cleaning(agent.target_room)
+            agent.fsm_state = "cleaning"
+        
+        for i in cleaned:
+            agent = self.agents[i]
+            agent.target_room.clean(elapsed_time)
+            self.claims.discard(agent.target_room)
+            agent.total_cleanings += 1
+            
+            if agent.needs_maintenance():
+                self._return_to_station(agent, station, "Maintenance → Station")
+            elif not self._assign_next(agent, environment, "Suivant: {target.name}"):
+                self._return_to_station(agent, station, "Terminé → Retour station")
+        
+        for i in returned:
+            agent = self.agents[i]
+            if agent.dirt_level >= MAX_DIRT_CAPACITY * self.policy.empty_threshold:
+                agent.current_action = "🗑️ Vidage..."
+                agent.start_emptying()
+                agent.fsm_state = "emptying"
+            else:
+                self._start_charging_or_rest(agent, "Station → En attente")
+        
+        for i in emptied:
+            self._start_charging_or_rest(self.agents[i], "Maintenance terminée ✓")
         
-        return []  # Pas de chemin trouvé
+        for i in charged:
+            self._rest(self.agents[i], "Recharge terminée ✓")
+        
+        if planner is not None:
+            planner.run(self, deadline)
 
 class VacuumAgent:
     """Agent aspirateur intelligent avec A*"""
-    def __init__(self, start_pos: Tuple[int, int], pathfinder: PathfindingAStar):
+    # État numérique partagé avec la flotte (structure de tableaux)
+    x = FleetField()
+    y = FleetField()
+    angle = FleetField()
+    speed = FleetField()
+    battery = FleetField()
+    dirt_level = FleetField()
+    cleaning_progress = FleetField()
+    charging_progress = FleetField()
+    emptying_progress = FleetField()
+    total_distance = FleetField()
+    time_cleaning = FleetField()
+    total_cleanings = FleetField(int)
+    state = FleetField(values=AGENT_STATES)
+    fsm_state = FleetField(values=FSM_STATES)
+    manual_mode = FleetField(bool)
+    
+    def __init__(self, start_pos: Tuple[int, int], pathfinder: PathfindingAStar, fleet: Fleet = None):
+        self.fleet = fleet if fleet is not None else Fleet(capacity=1)
+        self.index = self.fleet.allocate(self)
+        
         self.x, self.y = start_pos
         self.start_pos = start_pos
         self.target_x, self.target_y = start_pos
         self.state = AgentState.IDLE
-        self.speed = 4
-        self.size = 18
+        self.fsm_state = "waiting"
+        self.current_action = "Initialisation..."
+        self.speed = self.fleet.policy.speed
+        self.size = ROBOT_RADIUS
         self.angle = 0
         
         self.battery = MAX_BATTERY
@@ -363,13 +2150,17 @@ class VacuumAgent:
         self.target_room = None
         self.particles: List[Particle] = []
         
-        # Pathfinding
+        # Pathfinding (planificateur coopératif si la grille est partagée)
         self.pathfinder = pathfinder
+        self.planner: Optional[CooperativePlanner] = None
+        self.path_pool: Optional[PathPlanningPool] = None
+        self.time_sliced = False
+        self.goal_pos = start_pos
         self.current_path = []
-        self.path_index = 0
         
         # Mémoire
         self.rooms_memory = defaultdict(lambda: {"dirt_count": 0, "last_clean": 0})
+        self.priorities = RoomPriorityQueue(self.room_score)
         
         # Stats
         self.total_distance = 0
@@ -378,65 +2169,94 @@ class VacuumAgent:
         
         # Mode manuel
         self.manual_mode = False
+    
+    @property
+    def current_path(self) -> List[Tuple[int, int]]:
+        return self.fleet.paths[self.index]
+    
+    @current_path.setter
+    def current_path(self, path: List[Tuple[int, int]]):
+        self.fleet.set_path(self.index, path)
+    
+    @property
+    def path_index(self) -> int:
+        return int(self.fleet.path_index[self.index])
+    
+    @path_index.setter
+    def path_index(self, value: int):
+        self.fleet.set_path_index(self.index, value)
+    
+    def _one(self) -> np.ndarray:
+        return np.array([self.index])
         
     def learn_room_pattern(self, room: Room):
         """Apprend les patterns de saleté"""
         self.rooms_memory[room.name]["dirt_count"] += 1
+        self.priorities.refresh(room)
+    
+    def room_score(self, room: Room) -> float:
+        # Priorise : niveau de saleté + fréquence
+        policy = self.fleet.policy
+        return (room.get_dirt_value() * policy.dirt_weight
+                + self.rooms_memory[room.name]["dirt_count"] * policy.frequency_weight)
     
     def get_priority_room(self, dirty_rooms: List[Room]) -> Optional[Room]:
         """Choisit la pièce prioritaire"""
         if not dirty_rooms:
             return None
-        
-        # Priorise : niveau de saleté + fréquence
-        best_room = max(dirty_rooms, key=lambda r: 
-                       r.get_dirt_value() * 2 + self.rooms_memory[r.name]["dirt_count"] * 0.5)
-        return best_room
+        return max(dirty_rooms, key=self.room_score)
     
     def needs_maintenance(self) -> bool:
-        return self.battery < 25 or self.dirt_level >= MAX_DIRT_CAPACITY
+        return bool(self.fleet.needs_maintenance(self._one())[0])
     
     def move_to(self, target_pos: Tuple[int, int], target_room: Room = None):
         """Déplace l'agent vers une position via A*"""
-        self.current_path = self.pathfinder.find_path((self.x, self.y), target_pos)
-        self.path_index = 0
+        self.goal_pos = target_pos
         self.target_room = target_room
+        self.fleet.searches.pop(self.index, None)
+        if self.planner is not None:
+            self.replan()
+        elif self.time_sliced:
+            # Recherche découpée: premier chemin partiel tout de suite, suite aux frames suivantes
+            self.state = AgentState.PLANNING
+            search = self.pathfinder.start_search((self.x, self.y), target_pos)
+            search.step(SEARCH_NODES_PER_TICK, SEARCH_TIME_PER_TICK)
+            self.fleet.searches[self.index] = search
+            self.current_path = []
+            self.fleet.follow_search(self.index)
+        elif self.path_pool is not None:
+            # Calcul asynchrone: ligne droite si possible, sinon attente du résultat
+            self.current_path = self.pathfinder.straight_path((self.x, self.y), target_pos)
+            if self.current_path:
+                self.path_pool.cancel(self.index)
+            else:
+                self.state = AgentState.PLANNING
+                self.path_pool.submit(self.index, (self.x, self.y), target_pos)
+        else:
+            self.current_path = self.pathfinder.find_path((self.x, self.y), target_pos)
+            if not self.current_path:
+                self.fleet.route_failed(self.index)
         if self.current_path:
             self.state = AgentState.MOVING
     
+    def replan(self):
+        """Chemin coopératif sans conflit depuis la position courante (calculé par la flotte
+        dans le budget de la frame, l'agent attend sur place)"""
+        self.planner.request(self.index, (self.x, self.y), self.goal_pos, self.fleet.clock)
+        self.fleet.set_path(self.index, [])
+        self.state = AgentState.PLANNING
+    
     def update(self, dt: float) -> bool:
         """Met à jour l'agent"""
-        self.angle = (self.angle + 3) % 360
-        
-        # Déplacement le long du chemin
-        if self.state in [AgentState.MOVING, AgentState.RETURNING]:
-            if self.current_path and self.path_index < len(self.current_path):
-                target = self.current_path[self.path_index]
-                dx = target[0] - self.x
-                dy = target[1] - self.y
-                dist = math.sqrt(dx*dx + dy*dy)
-                
-                if dist < self.speed:
-                    self.x, self.y = target
-                    self.path_index += 1
-                    if self.path_index >= len(self.current_path):
-                        return True
-                else:
-                    self.x += (dx / dist) * self.speed
-                    self.y += (dy / dist) * self.speed
-                    self.total_distance += self.speed * dt
-                
-                self.battery = max(0, self.battery - BATTERY_DRAIN_MOVE * dt)
-        
-        # Particules
+        return bool(self.fleet.update(dt, self._one())[0])
+    
+    def update_particles(self, dt: float):
         for particle in self.particles[:]:
             particle.x += particle.vx
             particle.y += particle.vy
             particle.life -= dt
             if particle.life <= 0:
                 self.particles.remove(particle)
-        
-        return False
     
     def start_cleaning(self, room: Room):
         self.state = AgentState.CLEANING
@@ -444,16 +2264,10 @@ class VacuumAgent:
         self.current_room = room
     
     def update_cleaning(self, dt: float, room: Room) -> bool:
-        cleaning_time = room.get_cleaning_time()
-        self.cleaning_progress += dt / cleaning_time
-        
-        drain = BATTERY_DRAIN_CLEAN_BASE * (1 + room.get_dirt_value() * 0.5)
-        self.battery = max(0, self.battery - drain * dt)
-        self.dirt_level = min(MAX_DIRT_CAPACITY, 
-                             self.dirt_level + DIRT_PER_CLEAN * dt / cleaning_time)
-        self.time_cleaning += dt
-        
-        # Particules d'aspiration
+        return bool(self.fleet.update_cleaning(dt, self._one(), [room])[0])
+    
+    def emit_suction_particles(self):
+        """Particules d'aspiration"""
         if random.random() < 0.4:
             angle = random.uniform(0, math.pi * 2)
             speed = random.uniform(3, 6)
@@ -465,26 +2279,20 @@ class VacuumAgent:
                 life=0.8, size=random.uniform(2, 5),
                 color=tuple(color)
             ))
-        
-        return self.cleaning_progress >= 1.0
     
     def start_charging(self):
         self.state = AgentState.CHARGING
         self.charging_progress = 0
     
     def update_charging(self, dt: float) -> bool:
-        self.battery = min(MAX_BATTERY, self.battery + CHARGING_RATE * dt)
-        self.charging_progress = self.battery / MAX_BATTERY
-        return self.battery >= MAX_BATTERY
+        return bool(self.fleet.update_charging(dt, self._one())[0])
     
     def start_emptying(self):
         self.state = AgentState.EMPTYING
         self.emptying_progress = 0
     
     def update_emptying(self, dt: float) -> bool:
-        self.emptying_progress += dt / EMPTYING_TIME
-        self.dirt_level = max(0, self.dirt_level - (MAX_DIRT_CAPACITY * dt / EMPTYING_TIME))
-        return self.emptying_progress >= 1.0
+        return bool(self.fleet.update_emptying(dt, self._one())[0])
     
     def return_to_station(self, station_pos: Tuple[int, int]):
         self.state = AgentState.RETURNING
@@ -514,8 +2322,8 @@ class VacuumAgent:
         end_y = self.y + math.sin(math.radians(self.angle)) * (self.size - 4)
         pygame.draw.line(screen, Colors.TEXT, (self.x, self.y), (end_x, end_y), 2)
         
-        # LED clignotante
-        if int(pygame.time.get_ticks() / 500) % 2 == 0:
+        # LED clignotante (horloge de simulation: même rythme hors écran)
+        if int(self.fleet.clock / (FPS / 2)) % 2 == 0:
             led_x = self.x + math.cos(math.radians(self.angle + 90)) * 8
             led_y = self.y + math.sin(math.radians(self.angle + 90)) * 8
             pygame.draw.circle(screen, (255, 0, 0), (int(led_x), int(led_y)), 3)
@@ -549,57 +2357,539 @@ class VacuumAgent:
         fill_w = int(bar_w * progress)
         pygame.draw.rect(screen, color, (bar_x, bar_y, fill_w, bar_h), border_radius=3)
 
+# Plan par défaut (même format que les fichiers JSON de --plan)
+DEFAULT_FLOOR_PLAN = {
+    "width": WIDTH,
+    "height": HEIGHT,
+    "rooms": [
+        {"name": "Salon", "x": 50, "y": 50, "width": 300, "height": 250},
+        {"name": "Cuisine", "x": 370, "y": 50, "width": 280, "height": 250},
+        {"name": "Couloir", "x": 50, "y": 320, "width": 600, "height": 100},
+        {"name": "Chambre A", "x": 50, "y": 440, "width": 280, "height": 200},
+        {"name": "Chambre B", "x": 370, "y": 440, "width": 280, "height": 200}
+    ],
+    "obstacles": [
+        {"name": "Canapé", "x": 80, "y": 100, "width": 80, "height": 60},
+        {"name": "Table", "x": 200, "y": 180, "width": 60, "height": 60},
+        {"name": "Îlot", "x": 380, "y": 100, "width": 100, "height": 80},
+        {"name": "Lit", "x": 100, "y": 480, "width": 60, "height": 80},
+        {"name": "Bureau", "x": 380, "y": 500, "width": 80, "height": 60}
+    ],
+    "station": {"x": 300, "y": 350}
+}
+
+def load_floor_plan(path: str) -> dict:
+    """Lit un plan JSON (pièces, obstacles, station; largeur/hauteur optionnelles)"""
+    with open(path, encoding="utf-8") as f:
+        plan = json.load(f)
+    plan.setdefault("width", WIDTH)
+    plan.setdefault("height", HEIGHT)
+    for key in ("rooms", "obstacles", "station"):
+        if key not in plan:
+            raise ValueError(f"Plan {path}: clé '{key}' manquante")
+    return plan
+
+# Instantanés
+
+def pack_rows(rows: List[list], width: int, dtype=np.int64) -> Tuple[np.ndarray, np.ndarray]:
+    """Listes de longueurs variables → (valeurs concaténées, décalages)"""
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    values = np.array([item for row in rows for item in row], dtype=dtype).reshape(-1, width)
+    return values, offsets
+
+def unpack_rows(values: np.ndarray, offsets: np.ndarray) -> List[list]:
+    items = [tuple(row) for row in values.tolist()]
+    return [items[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+@dataclass
+class SimulationSnapshot:
+    """État dynamique complet de la simulation (le plan et les grilles n'en font pas partie).
+    Les chemins et particules sont partagés: ils sont remplacés, jamais modifiés sur place."""
+    arrays: Dict[str, np.ndarray]  # Flotte, pièces, mémoire des agents
+    paths: List[List[Tuple[int, int]]]
+    histories: List[List[float]]
+    particles: List[List[Tuple[int, int, float]]]
+    info: dict  # Scalaires et textes (JSON)
+    rng_state: tuple
+    reservations: Optional[Tuple[dict, dict, dict]] = None  # WHCA*: sommets, arêtes, stationnements
+    
+    def save(self, path: str):
+        """Écrit l'instantané (archive NumPy compressée, sans pickle)"""
+        arrays = dict(self.arrays)
+        arrays["paths"], arrays["paths_offsets"] = pack_rows(self.paths, 2)
+        arrays["histories"], arrays["histories_offsets"] = pack_rows(
+            [[(t,) for t in history] for history in self.histories], 1, np.float64)
+        arrays["particles"], arrays["particles_offsets"] = pack_rows(self.particles, 3, np.float64)
+        version, key, gauss = self.rng_state
+        arrays["rng_key"] = np.array(key, dtype=np.uint32)
+        info = dict(self.info, rng_version=version, rng_gauss=gauss)
+        if self.reservations is not None:
+            vertices, edges, parked = self.reservations
+            arrays["vertices"] = np.array([k + (a,) for k, a in vertices.items()], dtype=np.int64).reshape(-1, 4)
+            arrays["edges"] = np.array([k + (a,) for k, a in edges.items()], dtype=np.int64).reshape(-1, 6)
+            arrays["parked"] = np.array([k + v for k, v in parked.items()], dtype=np.int64).reshape(-1, 4)
+        arrays["info"] = np.frombuffer(json.dumps(info).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+    
+    @classmethod
+    def load(cls, path: str) -> 'SimulationSnapshot':
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        info = json.loads(arrays.pop("info").tobytes().decode("utf-8"))
+        rng_state = (info.pop("rng_version"), tuple(arrays.pop("rng_key").tolist()), info.pop("rng_gauss"))
+        paths = unpack_rows(arrays.pop("paths"), arrays.pop("paths_offsets"))
+        histories = [[t for (t,) in history] for history in
+                     unpack_rows(arrays.pop("histories"), arrays.pop("histories_offsets"))]
+        particles = [[(int(px), int(py), size) for px, py, size in room] for room in
+                     unpack_rows(arrays.pop("particles"), arrays.pop("particles_offsets"))]
+        reservations = None
+        if "vertices" in arrays:
+            vertices = {tuple(row[:3]): row[3] for row in arrays.pop("vertices").tolist()}
+            edges = {tuple(row[:5]): row[5] for row in arrays.pop("edges").tolist()}
+            parked = {tuple(row[:2]): tuple(row[2:]) for row in arrays.pop("parked").tolist()}
+            reservations = (vertices, edges, parked)
+        return cls(arrays, paths, histories, particles, info, rng_state, reservations)
+
 class Environment:
     """Environnement avec pièces et obstacles"""
-    def __init__(self):
-        # Définition des pièces
-        margin = 50
-        self.rooms = [
-            Room("Salon", margin, margin, 300, 250),
-            Room("Cuisine", margin + 320, margin, 280, 250),
-            Room("Couloir", margin, margin + 270, 600, 100),
-            Room("Chambre A", margin, margin + 390, 280, 200),
-            Room("Chambre B", margin + 320, margin + 390, 280, 200)
-        ]
-        
-        # Obstacles (meubles)
-        self.obstacles = [
-            Obstacle(80, 100, 80, 60, "Canapé"),
-            Obstacle(200, 180, 60, 60, "Table"),
-            Obstacle(380, 100, 100, 80, "Îlot"),
-            Obstacle(100, 480, 60, 80, "Lit"),
-            Obstacle(380, 500, 80, 60, "Bureau")
-        ]
-        
-        # Station
-        self.station = ChargingStation(margin + 250, margin + 300)
-        
-        # Pathfinding
-        self.pathfinder = PathfindingAStar(self)
-        
-        # Agent
-        self.agent = VacuumAgent(self.station.center, self.pathfinder)
-        
-        # Timing
+    def __init__(self, num_agents: int = 1, planning: str = "sync", heuristic: str = "manhattan",
+                 floor_plan: Optional[str] = None, policy: Optional[Policy] = None, navmesh: bool = False,
+                 clearance: bool = False):
+        plan = load_floor_plan(floor_plan) if floor_plan else DEFAULT_FLOOR_PLAN
+        self.rng = random  # Générateur global (les copies ont le leur)
+        self.policy = policy if policy is not None else Policy()
+        self.width = plan["width"]
+        self.height = plan["height"]
+        
+        # Pièces, obstacles (meubles) et station
+        self.rooms = [Room(r["name"], r["x"], r["y"], r["width"], r["height"]) for r in plan["rooms"]]
+        self.obstacles = [Obstacle(o["x"], o["y"], o["width"], o["height"], o["name"])
+                          for o in plan["obstacles"]]
+        self.station = ChargingStation(plan["station"]["x"], plan["station"]["y"])
+        
+        # Index spatial partagé (pièces et obstacles)
+        self.spatial_index = SpatialIndex()
+        for item in self.rooms + self.obstacles:
+            self.spatial_index.insert(item)
+        self.layout_dirty = False
+        
+        # Index de saleté (compteurs et files de priorité des agents)
+        self.dirt_index = DirtIndex()
+        for room in self.rooms:
+            self.dirt_index.add(room)
+        
+        # Grilles de navigation (cache projeté en mémoire à côté du fichier de plan)
+        if floor_plan:
+            self.navigation = NavigationData.load(plan, floor_plan + ".navcache")
+        else:
+            self.navigation = NavigationData.compile(plan)
+        
+        # Champ de dégagement (calculé à la première demande) et planification au rayon du robot
+        self._clearance: Optional[ClearanceField] = None
+        self.robot_clearance = clearance
+        
+        # Pathfinding (tables ALT recalculées par tranches après une modification du plan)
+        self.landmark_build = None
+        self.pathfinder = PathfindingAStar(self, heuristic)
+        self._use_clearance()
+        self._place_room_centers(strict=True)
+        
+        # Agents (flotte), l'agent sélectionné est suivi par le HUD
+        self._spawn_agents(max(1, num_agents))
+        
+        # Planification coopérative dès que plusieurs agents partagent la grille
+        self.planner = None
+        if len(self.agents) > 1:
+            station_cell = (self.station.center[0] // TILE_SIZE, self.station.center[1] // TILE_SIZE)
+            self.planner = CooperativePlanner(self.pathfinder, shared_cells={station_cell},
+                                              speed=self.policy.speed)
+            if not clearance:
+                self.planner._distance_maps[station_cell] = self.navigation.station_distance
+            self.fleet.step_frames = self.planner.step_frames
+            for agent in self.agents:
+                agent.planner = self.planner
+        
+        # Calcul des chemins A* hors frame: pool de threads ("async") ou par tranches ("sliced");
+        # les chemins coopératifs restent synchrones
+        self.path_pool = None
+        if planning == "async" and self.planner is None:
+            self.path_pool = PathPlanningPool(self.pathfinder)
+            for agent in self.agents:
+                agent.path_pool = self.path_pool
+        elif planning == "sliced" and self.planner is None:
+            for agent in self.agents:
+                agent.time_sliced = True
+        
+        # Navigation par quadtree pour les chemins calculés d'un bloc (synchrones ou en pool);
+        # recherches découpées et WHCA* restent sur la grille de tuiles
+        self.navmesh = None
+        if navmesh:
+            self.navmesh = self._build_navmesh()
+            self._use_navmesh()
+        
+        # Timing (temps écoulé: celui du dernier update; cycle automatique: avancé par Game)
+        self.elapsed_time = 0.0
+        self.cycle_timer = 0.0
         self.last_dirt_time = 0
-        self.dirt_interval = random.uniform(8, 15)
+        self.dirt_interval = self.rng.uniform(8, 15)
         
         # Saletés initiales
-        for room in random.sample(self.rooms, 3):
-            room.make_dirty(DirtLevel(random.randint(1, 2)))
+        for room in self.rng.sample(self.rooms, min(3, len(self.rooms))):
+            room.make_dirty(DirtLevel(self.rng.randint(1, 2)))
+    
+    @property
+    def clearance(self) -> ClearanceField:
+        """Champ de dégagement du plan courant, recalculé après modification du plan"""
+        if self._clearance is None:
+            self._clearance = ClearanceField(self.width, self.height, self.obstacles)
+        return self._clearance
+    
+    def clearance_at(self, x: float, y: float) -> float:
+        """Distance (px) du point au meuble ou au mur le plus proche"""
+        return self.clearance.at(x, y)
+    
+    def _use_clearance(self):
+        if not self.robot_clearance:
+            return
+        pathfinder = self.pathfinder
+        pathfinder.use_clearance(self.navigation.walkable,
+                                 self.clearance.tiles(pathfinder.grid_width, pathfinder.grid_height))
+    
+    def _place_room_centers(self, strict: bool = False):
+        """But de chaque pièce ramené sur la case praticable de la pièce la plus proche de son
+        centre géométrique. Pièce sans case praticable: ValueError si strict (chargement du plan),
+        centre géométrique sinon (pièce écartée par route_failed)"""
+        walkable = self.pathfinder.walkable_grid()
+        half = TILE_SIZE // 2
+        for room in self.rooms:
+            cx, cy = room.x + room.width // 2, room.y + room.height // 2
+            room.center = (cx, cy)
+            if walkable[cx // TILE_SIZE, cy // TILE_SIZE]:
+                continue
+            # Cases dont le centre est dans la pièce
+            x0, y0 = max(0, -(-(room.x - half) // TILE_SIZE)), max(0, -(-(room.y - half) // TILE_SIZE))
+            x1 = min(walkable.shape[0], (room.x + room.width - 1 - half) // TILE_SIZE + 1)
+            y1 = min(walkable.shape[1], (room.y + room.height - 1 - half) // TILE_SIZE + 1)
+            free = np.argwhere(walkable[x0:x1, y0:y1]) if x1 > x0 and y1 > y0 else np.empty((0, 2))
+            if not len(free):
+                if strict:
+                    raise ValueError(f"Pièce '{room.name}': aucune case accessible au robot")
+                continue
+            centers = (free + (x0, y0)) * TILE_SIZE + half
+            nearest = centers[np.argmin(((centers - (cx, cy)) ** 2).sum(axis=1))]
+            room.center = (int(nearest[0]), int(nearest[1]))
+    
+    def _build_navmesh(self) -> 'QuadtreeNavMesh':
+        # Mode --clearance: quadtree de l'espace des configurations du centre du robot
+        return QuadtreeNavMesh(self.width, self.height, self.obstacles,
+                               radius=ROBOT_RADIUS if self.robot_clearance else 0)
+    
+    def _use_navmesh(self):
+        if self.navmesh is None or self.planner is not None:
+            return
+        for agent in self.agents:
+            if not agent.time_sliced:
+                agent.pathfinder = self.navmesh
+        if self.path_pool is not None:
+            self.path_pool.pathfinder = self.navmesh
+    
+    def _spawn_agents(self, count: int):
+        self.fleet = Fleet(capacity=count, policy=self.policy)
+        self.agents = [self.fleet.spawn(self.station.center, self.pathfinder) for _ in range(count)]
+        self.agent = self.agents[0]
+        for agent in self.agents:
+            self.dirt_index.listeners.append(agent.priorities.update)
     
     def update_dirt(self, elapsed_time: float):
         if elapsed_time - self.last_dirt_time >= self.dirt_interval:
-            # Salit une pièce aléatoire
-            room = random.choice([r for r in self.rooms if r.dirt_level.value < 3])
-            room.make_dirty()
-            print(f"🗑️ {room.name} → {room.dirt_level.name}")
+            # Salit une pièce aléatoire (aucune si toutes sont déjà saturées)
+            if self.dirt_index.not_saturated_count:
+                room = self.dirt_index.not_saturated_room(self.rng.randrange(self.dirt_index.not_saturated_count))
+                room.make_dirty()
+                print(f"🗑️ {room.name} → {room.dirt_level.name}")
             
             self.last_dirt_time = elapsed_time
-            self.dirt_interval = random.uniform(8, 15)
+            self.dirt_interval = self.rng.uniform(8, 15)
     
     def get_dirty_rooms(self) -> List[Room]:
-        return [r for r in self.rooms if r.dirt_level != DirtLevel.CLEAN]
+        return self.dirt_index.dirty_rooms()
+    
+    def room_containing(self, x: float, y: float) -> Optional[Room]:
+        """Première pièce contenant le point (au pixel près)"""
+        for room in self.spatial_index.query_point(x, y, Room):
+            if room.contains_point(x, y):
+                return room
+        return None
+    
+    def obstacles_in(self, x: float, y: float, width: float, height: float) -> List[Obstacle]:
+        return self.spatial_index.query_rect(x, y, width, height, Obstacle)
+    
+    def add_obstacle(self, obstacle: Obstacle):
+        self.obstacles.append(obstacle)
+        self.spatial_index.insert(obstacle)
+        self._refresh_walkable(obstacle)
+    
+    def remove_obstacle(self, obstacle: Obstacle):
+        self.obstacles.remove(obstacle)
+        self.spatial_index.remove(obstacle)
+        self._refresh_walkable(obstacle)
+    
+    def add_room(self, room: Room):
+        self.rooms.append(room)
+        self.spatial_index.insert(room)
+        self.dirt_index.add(room)
+        for agent in self.agents:
+            agent.priorities.update(room, self.dirt_index.positions[room])
+    
+    def _writable(self, name: str) -> np.ndarray:
+        """Copie privée d'une grille projetée depuis le cache avant modification"""
+        array = getattr(self.navigation, name)
+        if not array.flags.writeable:
+            array = np.array(array)
+            setattr(self.navigation, name, array)
+        return array
+    
+    def _refresh_walkable(self, rect):
+        """Recalcule les cases sous rect (données dépendantes: au prochain update)"""
+        walkable = self._writable("walkable")
+        region = blocked_tiles(rect.x, rect.y, rect.width, rect.height)
+        walkable[region] = True
+        for obstacle in self.obstacles_in(rect.x, rect.y, rect.width, rect.height):
+            sx, sy = blocked_tiles(obstacle.x, obstacle.y, obstacle.width, obstacle.height)
+            walkable[max(sx.start, region[0].start):min(sx.stop, region[0].stop),
+                     max(sy.start, region[1].start):min(sy.stop, region[1].stop)] = False
+        # Mode --clearance: cases libérées rendues au prochain update, avec le nouveau champ
+        self.pathfinder._walkable = walkable & self.pathfinder._walkable if self.robot_clearance else walkable
+        self._clearance = None
+        self.layout_dirty = True
+    
+    def refresh_navigation(self):
+        """Distance à la station, cartes WHCA* et quadtree après modification du plan;
+        landmarks recalculés par tranches (step_landmarks)"""
+        walkable = self.navigation.walkable
+        station_cell = (self.station.center[0] // TILE_SIZE, self.station.center[1] // TILE_SIZE)
+        self.navigation.station_distance = distance_field(walkable, [station_cell]).astype(np.float32)
+        self._use_clearance()
+        if self.pathfinder.landmarks is not None or self.landmark_build is not None:
+            # A* classique le temps de la reconstruction, avancée à chaque update
+            self.pathfinder.landmarks = None
+            self.landmark_build = LandmarkTable.build_steps(walkable)
+        if self.planner is not None:
+            self.planner.walkable = self.pathfinder.walkable_grid()
+            self.planner._distance_maps = {} if self.robot_clearance else \
+                {station_cell: self.navigation.station_distance}
+        if self.navmesh is not None:
+            self.navmesh = self._build_navmesh()
+            self._use_navmesh()
+        self._place_room_centers()
+        self.fleet.unreachable.clear()  # Plan modifié: pièces écartées de nouveau candidates
+        self.layout_dirty = False
+    
+    def step_landmarks(self, max_time: float):
+        """Avance la reconstruction des tables ALT, installées (et reportées dans les grilles
+        de navigation) une fois terminée"""
+        deadline = time.perf_counter() + max_time
+        try:
+            while time.perf_counter() < deadline:
+                next(self.landmark_build)
+        except StopIteration as done:
+            table = done.value
+            self.navigation.landmarks, self.navigation.landmark_distances = table.landmarks, table.distances
+            self.pathfinder.landmarks = table
+            self.landmark_build = None
+    
+    def snapshot(self, elapsed_time: Optional[float] = None) -> SimulationSnapshot:
+        """Capture l'état dynamique: saleté des pièces, agents, FSM, minuteries et générateur
+        (temps écoulé: celui du dernier update si elapsed_time n'est pas donné)"""
+        fleet = self.fleet
+        n = fleet.size
+        positions = self.dirt_index.positions
+        arrays = {f"fleet.{name}": getattr(fleet, name)[:n].copy()
+                  for name in Fleet.FLOAT_FIELDS + Fleet.INT_FIELDS + Fleet.BOOL_FIELDS}
+        arrays["room_levels"] = np.array([r.dirt_level.value for r in self.rooms], dtype=np.int8)
+        arrays["room_last_cleaned"] = np.array([r.last_cleaned for r in self.rooms], dtype=np.float64)
+        memory = [[agent.rooms_memory.get(r.name, {"dirt_count": 0, "last_clean": 0}) for r in self.rooms]
+                  for agent in self.agents]
+        arrays["memory_counts"] = np.array([[m["dirt_count"] for m in row] for row in memory],
+                                           dtype=np.int64).reshape(n, len(self.rooms))
+        arrays["memory_last_clean"] = np.array([[m["last_clean"] for m in row] for row in memory],
+                                               dtype=np.float64).reshape(n, len(self.rooms))
+        arrays["claims"] = np.array(sorted(positions[r] for r in fleet.claims), dtype=np.int64)
+        arrays["targets"] = np.array([positions.get(a.target_room, -1) for a in self.agents], dtype=np.int64)
+        arrays["current_rooms"] = np.array([positions.get(a.current_room, -1) for a in self.agents],
+                                           dtype=np.int64)
+        arrays["goals"] = np.array([a.goal_pos for a in self.agents], dtype=np.float64).reshape(n, 2)
+        pending = set(fleet.searches)
+        if self.path_pool is not None:
+            pending.update(self.path_pool.pending)
+        if self.planner is not None:
+            pending.update(self.planner.requests)
+        arrays["searching"] = np.isin(np.arange(n), list(pending))
+        info = {
+            "elapsed_time": self.elapsed_time if elapsed_time is None else elapsed_time,
+            "cycle_timer": self.cycle_timer,
+            "last_dirt_time": self.last_dirt_time,
+            "dirt_interval": self.dirt_interval,
+            "animation": self.station.animation,
+            "clock": fleet.clock,
+            "step_frames": fleet.step_frames,
+            "selected": self.agent.index,
+            "actions": [a.current_action for a in self.agents],
+        }
+        reservations = None
+        if self.planner is not None:
+            table = self.planner.reservations
+            reservations = (dict(table.vertices), dict(table.edges), dict(table.parked))
+            info["docking"] = sorted(table.docking)
+        return SimulationSnapshot(arrays, list(fleet.paths), [list(r.dirt_history) for r in self.rooms],
+                                  [r.dirt_particles for r in self.rooms], info, self.rng.getstate(),
+                                  reservations)
+    
+    def restore(self, snapshot: SimulationSnapshot):
+        """Remet la simulation dans l'état capturé (même plan, même nombre d'agents).
+        Les recherches A* en cours au moment de la capture sont relancées."""
+        arrays, info = snapshot.arrays, snapshot.info
+        fleet = self.fleet
+        n = fleet.size
+        if len(snapshot.paths) != n or len(arrays["room_levels"]) != len(self.rooms):
+            raise ValueError(f"Instantané de {len(snapshot.paths)} agents et {len(arrays['room_levels'])} "
+                             f"pièces, simulation de {n} agents et {len(self.rooms)} pièces")
+        
+        # Pièces (l'index de saleté suit les changements de niveau)
+        for i, room in enumerate(self.rooms):
+            room.dirt_level = DirtLevel(int(arrays["room_levels"][i]))
+            room.last_cleaned = float(arrays["room_last_cleaned"][i])
+            room.dirt_history = list(snapshot.histories[i])
+            room.dirt_particles = snapshot.particles[i]
+        
+        # Flotte
+        for name in Fleet.FLOAT_FIELDS + Fleet.INT_FIELDS + Fleet.BOOL_FIELDS:
+            getattr(fleet, name)[:n] = arrays[f"fleet.{name}"]
+        fleet.paths[:] = snapshot.paths
+        fleet.claims = {self.rooms[i] for i in arrays["claims"]}
+        fleet.unreachable.clear()
+        fleet.searches.clear()
+        fleet.clock = info["clock"]
+        fleet.step_frames = info["step_frames"]
+        if self.path_pool is not None:
+            for agent_id in list(self.path_pool.pending):
+                self.path_pool.cancel(agent_id)
+        if self.planner is not None and snapshot.reservations is not None:
+            table = self.planner.reservations
+            self.planner.requests.clear()
+            self.planner.search = None
+            table.vertices, table.edges, table.parked = (dict(d) for d in snapshot.reservations)
+            table.docking = set(info.get("docking", ()))
+            table.owned = defaultdict(list)
+            for store in (table.vertices, table.edges):
+                for key, agent_id in store.items():
+                    table.owned[agent_id].append((store, key))
+        
+        # Agents
+        for i, agent in enumerate(self.agents):
+            target, current = arrays["targets"][i], arrays["current_rooms"][i]
+            agent.target_room = self.rooms[target] if target >= 0 else None
+            agent.current_room = self.rooms[current] if current >= 0 else None
+            agent.goal_pos = tuple(int(v) if v == int(v) else float(v) for v in arrays["goals"][i])
+            agent.current_action = info["actions"][i]
+            agent.particles = []
+            agent.rooms_memory.clear()
+            for j, room in enumerate(self.rooms):
+                count, last_clean = arrays["memory_counts"][i, j], arrays["memory_last_clean"][i, j]
+                if count or last_clean:
+                    agent.rooms_memory[room.name] = {"dirt_count": int(count), "last_clean": float(last_clean)}
+            agent.priorities.clear()
+            for room in self.dirt_index.dirty:
+                agent.priorities.update(room, self.dirt_index.positions[room])
+        
+        # Minuteries et générateur
+        self.elapsed_time = info["elapsed_time"]
+        self.cycle_timer = info.get("cycle_timer", 0.0)
+        self.last_dirt_time = info["last_dirt_time"]
+        self.dirt_interval = info["dirt_interval"]
+        self.station.animation = info["animation"]
+        self.agent = self.agents[info["selected"]]
+        self.rng.setstate(snapshot.rng_state)
+        
+        for i in np.flatnonzero(arrays["searching"]):
+            agent = self.agents[i]
+            agent.move_to(agent.goal_pos, agent.target_room)
+    
+    def fork(self, elapsed_time: Optional[float] = None) -> 'Environment':
+        """Copie indépendante de la simulation pour évaluer un futur possible.
+        Le plan (grilles, landmarks, cartes de distance) est partagé en lecture seule
+        et copié à la première modification; la copie planifie en synchrone,
+        sans particules, avec son propre générateur aléatoire."""
+        clone = copy.copy(self)
+        clone.rng = random.Random()
+        clone.rooms = [Room(r.name, r.x, r.y, r.width, r.height) for r in self.rooms]
+        for room, original in zip(clone.rooms, self.rooms):
+            room.rng = clone.rng
+            room.center = original.center  # But ramené sur une case praticable
+        clone.obstacles = list(self.obstacles)
+        clone.station = ChargingStation(self.station.x, self.station.y)
+        clone.spatial_index = SpatialIndex(self.spatial_index.cell_size)
+        for item in clone.rooms + clone.obstacles:
+            clone.spatial_index.insert(item)
+        clone.dirt_index = DirtIndex()
+        for room in clone.rooms:
+            clone.dirt_index.add(room)
+        
+        # Grilles partagées en lecture seule des deux côtés: _writable en fait une copie
+        # privée avant la première modification
+        clone.navigation = copy.copy(self.navigation)
+        for name, _ in NavigationData.ARRAYS:
+            array = getattr(self.navigation, name)
+            if array.flags.writeable:
+                array = array.view()
+                array.flags.writeable = False
+                setattr(self.navigation, name, array)
+            setattr(clone.navigation, name, array)
+        if not self.robot_clearance:
+            self.pathfinder._walkable = self.navigation.walkable
+            if self.planner is not None:
+                self.planner.walkable = self.navigation.walkable
+        clone.pathfinder = copy.copy(self.pathfinder)
+        clone.pathfinder.environment = clone
+        if self.landmark_build is not None:
+            clone.landmark_build = LandmarkTable.build_steps(clone.navigation.walkable)
+        if not self.robot_clearance:
+            clone.pathfinder._walkable = clone.navigation.walkable
+        
+        clone._spawn_agents(len(self.agents))
+        clone.fleet.effects = False
+        clone.path_pool = None
+        if self.planner is not None:
+            clone.planner = copy.copy(self.planner)
+            clone.planner.pathfinder = clone.pathfinder
+            clone.planner.walkable = clone.pathfinder.walkable_grid()
+            clone.planner.reservations = ReservationTable(self.planner.reservations.shared_cells)
+            clone.planner._distance_maps = dict(self.planner._distance_maps)
+            clone.planner.requests = {}
+            clone.planner.search = None
+        for agent in clone.agents:
+            agent.planner = clone.planner
+        clone._use_navmesh()
+        clone.restore(self.snapshot(elapsed_time))
+        return clone
+    
+    def select_next_agent(self):
+        self.agent = self.agents[(self.agent.index + 1) % len(self.agents)]
+    
+    def update(self, dt: float, elapsed_time: float):
+        """Avance la simulation d'un pas (sans affichage)"""
+        self.elapsed_time = elapsed_time
+        if self.layout_dirty:
+            self.refresh_navigation()
+        if self.landmark_build is not None:
+            self.step_landmarks(SEARCH_TIME_PER_TICK)
+        self.update_dirt(elapsed_time)
+        self.station.update(dt)
+        self.fleet.run_fsm(self, 1/FPS, elapsed_time)
+        # Agent updates (particules)
+        self.fleet.update_idle(dt)
     
     def draw(self, screen: pygame.Surface):
         for room in self.rooms:
@@ -607,26 +2897,338 @@ class Environment:
         for obstacle in self.obstacles:
             obstacle.draw(screen)
         self.station.draw(screen)
-        self.agent.draw(screen)
+        for agent in self.agents:
+            agent.draw(screen)
+
+# Télémétrie
+
+TELEMETRY_FIELDS = ("x", "y", "battery", "dirt", "state")
+
+def telemetry_state(environment: 'Environment') -> Tuple[int, List[tuple], List[int], List[str]]:
+    """(frame, agents, niveaux des pièces, noms des pièces), valeurs arrondies pour des deltas compacts"""
+    fleet = environment.fleet
+    n = len(fleet)
+    agents = list(zip(np.round(fleet.x[:n], 1).tolist(), np.round(fleet.y[:n], 1).tolist(),
+                      np.round(fleet.battery[:n], 1).tolist(), np.round(fleet.dirt_level[:n], 1).tolist(),
+                      [FSM_STATES[code] for code in fleet.fsm_state[:n]]))
+    rooms = environment.rooms
+    return fleet.clock, agents, [r.dirt_level.value for r in rooms], [r.name for r in rooms]
+
+def encode_telemetry(previous: Optional[tuple], state: tuple) -> Optional[dict]:
+    """Trame complète (k) sans état précédent, sinon seulement les champs modifiés"""
+    frame, agents, levels, names = state
+    if previous is None or previous[3] != names:
+        return {"f": frame, "k": 1, "fields": TELEMETRY_FIELDS, "a": agents, "r": levels, "n": names}
+    _, old_agents, old_levels, _ = previous
+    changed = {}
+    for i, row in enumerate(agents):
+        old = old_agents[i] if i < len(old_agents) else (None,) * len(row)
+        if row != old:
+            changed[str(i)] = {f: v for f, v, o in zip(TELEMETRY_FIELDS, row, old) if v != o}
+    rooms = {str(i): level for i, (level, old) in enumerate(zip(levels, old_levels)) if level != old}
+    if not changed and not rooms:
+        return None
+    frame_delta = {"f": frame}
+    if changed:
+        frame_delta["a"] = changed
+    if rooms:
+        frame_delta["r"] = rooms
+    return frame_delta
+
+def apply_telemetry(state: Optional[dict], frame: dict) -> dict:
+    """Reconstruit l'état côté client à partir des trames reçues"""
+    if frame.get("k"):
+        return {"frame": frame["f"], "rooms": dict(zip(frame["n"], frame["r"])),
+                "agents": [dict(zip(frame["fields"], row)) for row in frame["a"]]}
+    state["frame"] = frame["f"]
+    names = list(state["rooms"])
+    for i, level in frame.get("r", {}).items():
+        state["rooms"][names[int(i)]] = level
+    for i, fields in frame.get("a", {}).items():
+        i = int(i)
+        while len(state["agents"]) <= i:
+            state["agents"].append({})
+        state["agents"][i].update(fields)
+    return state
+
+class TelemetryServer:
+    """Serveur TCP asyncio (une trame JSON par ligne) dans un thread à part.
+    La simulation publie sans attendre; chaque client reçoit au plus `rate` trames/s
+    et seulement le dernier état (les états intermédiaires d'un client lent sont sautés);
+    l'arrêt envoie encore à chaque client le dernier état publié."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, rate: float = 10, max_rate: float = 30):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.max_rate = max_rate
+        self.clients = 0
+        self.latest: Optional[tuple] = None
+        self.version = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._last_publish = 0.0
+        self._ready = threading.Event()
+        self.sessions: Set[asyncio.Task] = set()
+    
+    def start(self) -> 'TelemetryServer':
+        self.thread = threading.Thread(target=self._serve, name="telemetry", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        return self
+    
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        self.updated = asyncio.Condition()
+        self.closing = asyncio.Event()
+        server = self.loop.run_until_complete(asyncio.start_server(self._client, self.host, self.port))
+        self.port = server.sockets[0].getsockname()[1]  # Port choisi par le système si 0
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+    
+    def stop(self):
+        """Arrêt après l'envoi du dernier état aux clients (une seconde au plus)"""
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+    
+    async def _shutdown(self):
+        async with self.updated:
+            self.closing.set()
+            self.updated.notify_all()
+        if self.sessions:
+            await asyncio.wait(self.sessions, timeout=1.0)
+    
+    def publish(self, environment: 'Environment', force: bool = False):
+        """Appelé à chaque frame: capture l'état seulement si un client peut le recevoir
+        (force: sans limite de débit, pour l'état final avant stop)"""
+        now = time.monotonic()
+        if self.clients == 0 or (not force and now - self._last_publish < 1 / self.max_rate):
+            return
+        self._last_publish = now
+        state = telemetry_state(environment)
+        self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._set_latest(state)))
+    
+    async def _set_latest(self, state: tuple):
+        async with self.updated:
+            self.latest = state
+            self.version += 1
+            self.updated.notify_all()
+    
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Une connexion: le client peut envoyer "rate <Hz>" à tout moment"""
+        self.clients += 1
+        self.sessions.add(asyncio.current_task())
+        client = {"rate": self.rate}
+        controls = self.loop.create_task(self._read_controls(reader, client))
+        previous, version = None, 0
+        try:
+            while True:
+                # Nouvel état ou déconnexion, selon ce qui arrive en premier (client inactif compris)
+                waiter = self.loop.create_task(self._next_state(version))
+                await asyncio.wait({waiter, controls}, return_when=asyncio.FIRST_COMPLETED)
+                if controls.done():
+                    waiter.cancel()
+                    break
+                state, latest_version = waiter.result()
+                if latest_version > version:
+                    version = latest_version
+                    frame = encode_telemetry(previous, state)
+                    previous = state
+                    if frame is not None:
+                        writer.write(json.dumps(frame, separators=(",", ":")).encode("utf-8") + b"\n")
+                        await writer.drain()  # Contre-pression: ce client seul attend
+                if self.closing.is_set():
+                    break
+                try:
+                    await asyncio.wait_for(self.closing.wait(), 1 / client["rate"])
+                except asyncio.TimeoutError:
+                    pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients -= 1
+            self.sessions.discard(asyncio.current_task())
+            controls.cancel()
+            writer.close()
+    
+    async def _next_state(self, version: int) -> Tuple[Optional[tuple], int]:
+        async with self.updated:
+            await self.updated.wait_for(lambda: self.version > version or self.closing.is_set())
+            return self.latest, self.version
+    
+    async def _read_controls(self, reader: asyncio.StreamReader, client: dict):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return  # Client déconnecté
+            command = line.decode("utf-8", "replace").split()
+            if len(command) == 2 and command[0] == "rate":
+                try:
+                    client["rate"] = min(self.max_rate, max(0.1, float(command[1])))
+                except ValueError:
+                    pass
+
+async def watch_telemetry(host: str, port: int, frames: Optional[int] = None, rate: Optional[float] = None,
+                          on_state: Optional[Callable[[dict], None]] = None) -> Optional[dict]:
+    """Client de télémétrie: applique les trames reçues et renvoie le dernier état"""
+    reader, writer = await asyncio.open_connection(host, port)
+    if rate is not None:
+        writer.write(f"rate {rate}\n".encode("utf-8"))
+    state, received = None, 0
+    try:
+        while frames is None or received < frames:
+            line = await reader.readline()
+            if not line:
+                break
+            state = apply_telemetry(state, json.loads(line))
+            received += 1
+            if on_state is not None:
+                on_state(state)
+    finally:
+        writer.close()
+    return state
+
+# Export d'images
+
+def encode_png(pixels: np.ndarray, level: int = 1) -> bytes:
+    """PNG RGB 8 bits d'un tableau (hauteur, largeur, 3); zlib relâche le GIL pendant la compression"""
+    height, width, _ = pixels.shape
+    rows = np.empty((height, 1 + width * 3), dtype=np.uint8)
+    rows[:, 0] = 0  # Filtre "None" sur chaque ligne
+    rows[:, 1:].reshape(height, width, 3)[...] = pixels
+    
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), level)) + chunk(b"IEND", b""))
+
+class FrameExporter:
+    """Export d'images hors écran: surfaces recyclées et file bornée de threads d'encodage.
+    Les workers lisent les pixels sans copie (pygame.surfarray.pixels3d) puis rendent la surface."""
+    def __init__(self, output: str, fmt: str = "png", workers: int = 4, queue_size: int = 8,
+                 size: Tuple[int, int] = (WIDTH, HEIGHT)):
+        self.output = output
+        self.fmt = fmt
+        self.file = None
+        if fmt == "raw":
+            workers = 1  # Un seul flux, images dans l'ordre
+            self.file = open(output, "wb")
+        else:
+            os.makedirs(output, exist_ok=True)
+        self.size = size
+        self.free = queue.Queue()
+        for _ in range(queue_size + workers):
+            self.free.put(pygame.Surface(size, 0, 32))
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.frames = 0
+        self.error: Optional[BaseException] = None
+        self.threads = [threading.Thread(target=self._work, name=f"export-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def acquire(self) -> pygame.Surface:
+        """Surface libre où dessiner la prochaine image (attend si les workers sont en retard)"""
+        return self.free.get()
+    
+    def submit(self, surface: pygame.Surface):
+        if self.error is not None:
+            raise self.error
+        self.jobs.put((self.frames, surface))
+        self.frames += 1
+    
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            index, surface = job
+            pixels = None
+            try:
+                pixels = pygame.surfarray.pixels3d(surface).transpose(1, 0, 2)  # Vue (hauteur, largeur, 3)
+                if self.fmt == "raw":
+                    self.file.write(pixels.tobytes())
+                else:
+                    with open(os.path.join(self.output, f"frame_{index:06d}.png"), "wb") as f:
+                        f.write(encode_png(pixels))
+            except Exception as error:
+                self.error = error
+            finally:
+                del pixels  # Déverrouille la surface
+                self.free.put(surface)  # Toujours rendue: acquire() ne reste pas bloqué
+    
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.file is not None:
+            self.file.close()
+        if self.error is not None:
+            raise self.error
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("🤖 Aspirateur Autonome Intelligent A*")
+    def __init__(self, num_agents: int = 1, planning: str = "async", heuristic: str = "manhattan",
+                 floor_plan: Optional[str] = None, offscreen: bool = False, navmesh: bool = False,
+                 clearance: bool = False):
+        if offscreen:
+            self.screen = pygame.Surface((WIDTH, HEIGHT), 0, 32)
+        else:
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption("🤖 Aspirateur Autonome Intelligent A*")
         self.clock = pygame.time.Clock()
         self.running = True
         
-        self.environment = Environment()
-        self.elapsed_time = 0
-        self.cycle_timer = 0
-        self.current_action = "Initialisation..."
-        
-        self.fsm_state = "waiting"
+        self.environment = Environment(num_agents, planning, heuristic, floor_plan, navmesh=navmesh,
+                                       clearance=clearance)
+        self.telemetry: Optional[TelemetryServer] = None
         
         self.font_title = pygame.font.Font(None, 32)
         self.font_stats = pygame.font.Font(None, 22)
         self.font_small = pygame.font.Font(None, 18)
     
+    @property
+    def elapsed_time(self) -> float:
+        return self.environment.elapsed_time
+    
+    @elapsed_time.setter
+    def elapsed_time(self, value: float):
+        self.environment.elapsed_time = value
+    
+    @property
+    def cycle_timer(self) -> float:
+        return self.environment.cycle_timer
+    
+    @cycle_timer.setter
+    def cycle_timer(self, value: float):
+        self.environment.cycle_timer = value
+    
+    @property
+    def current_action(self) -> str:
+        return self.environment.agent.current_action
+    
+    @current_action.setter
+    def current_action(self, action: str):
+        self.environment.agent.current_action = action
+    
+    @property
+    def fsm_state(self) -> str:
+        return self.environment.agent.fsm_state
+    
+    @fsm_state.setter
+    def fsm_state(self, state: str):
+        self.environment.agent.fsm_state = state
+    
     def draw_hud(self):
         """HUD avec statistiques"""
         hud_x = WIDTH - 350
@@ -749,7 +3351,7 @@ class Game:
         
         # Efficacité
         total_rooms = len(self.environment.rooms)
-        clean_rooms = sum(1 for r in self.environment.rooms if r.dirt_level == DirtLevel.CLEAN)
+        clean_rooms = self.environment.dirt_index.clean_count
         efficiency = (clean_rooms / total_rooms) * 100
         eff_text = self.font_small.render(f"Propreté: {efficiency:.0f}%", True, Colors.CLEAN if efficiency > 70 else Colors.DUSTY)
         self.screen.blit(eff_text, (hud_x + 25, y_offset))
@@ -781,6 +3383,12 @@ class Game:
             mode_text = self.font_small.render("🤖 MODE AUTO", True, Colors.CLEAN)
             self.screen.blit(mode_text, (hud_x + 25, y_offset))
         
+        # Robot suivi
+        if len(self.environment.agents) > 1:
+            robot_text = self.font_small.render(
+                f"Robot {agent.index + 1}/{len(self.environment.agents)} (Tab)", True, (150, 150, 150))
+            self.screen.blit(robot_text, (hud_x + 180, y_offset))
+        
         # Contrôles
         y_offset = hud_y + hud_h - 80
         pygame.draw.line(self.screen, Colors.PANEL_ACCENT, 
@@ -823,20 +3431,21 @@ class Game:
             return
         
         speed = 3
-        moved = False
+        dx = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * speed
+        dy = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * speed
         
-        if keys[pygame.K_LEFT]:
-            agent.x -= speed
-            moved = True
-        if keys[pygame.K_RIGHT]:
-            agent.x += speed
-            moved = True
-        if keys[pygame.K_UP]:
-            agent.y -= speed
-            moved = True
-        if keys[pygame.K_DOWN]:
-            agent.y += speed
-            moved = True
+        # Collision: refusé si le corps toucherait un meuble ou un mur (sauf pour s'en éloigner),
+        # axe par axe pour glisser le long des obstacles
+        environment = self.environment
+        moved = False
+        for mx, my in ((dx, 0), (0, dy)):
+            if not (mx or my):
+                continue
+            free = environment.clearance_at(agent.x + mx, agent.y + my)
+            if free >= agent.size or free >= environment.clearance_at(agent.x, agent.y):
+                agent.x += mx
+                agent.y += my
+                moved = True
         
         if moved:
             agent.battery = max(0, agent.battery - BATTERY_DRAIN_MOVE * (1/FPS))
@@ -844,99 +3453,33 @@ class Game:
         
         # Nettoyage manuel
         if keys[pygame.K_SPACE]:
-            for room in self.environment.rooms:
-                if (room.x < agent.x < room.x + room.width and 
-                    room.y < agent.y < room.y + room.height):
-                    if agent.state != AgentState.CLEANING:
-                        agent.start_cleaning(room)
-                        self.current_action = f"Nettoyage manuel: {room.name}"
-                    break
+            room = self.environment.room_containing(agent.x, agent.y)
+            if room is not None and agent.state != AgentState.CLEANING:
+                agent.start_cleaning(room)
+                self.current_action = f"Nettoyage manuel: {room.name}"
     
     def run_fsm(self):
-        """Automate à états finis"""
-        agent = self.environment.agent
-        station = self.environment.station
-        
-        if agent.manual_mode:
-            return
-        
-        # Priorité: maintenance
-        if self.fsm_state == "waiting" and agent.needs_maintenance():
-            self.current_action = "⚠️ Maintenance → Station"
-            agent.return_to_station(station.center)
-            self.fsm_state = "returning"
-            return
-        
-        if self.fsm_state == "waiting":
-            dirty_rooms = self.environment.get_dirty_rooms()
-            if dirty_rooms:
-                target = agent.get_priority_room(dirty_rooms)
-                agent.learn_room_pattern(target)
-                self.current_action = f"Cible: {target.name} (niveau {target.dirt_level.value})"
-                agent.move_to(target.center, target)
-                self.fsm_state = "moving"
-            else:
-                self.current_action = "Surveillance → Tout propre ✓"
-        
-        elif self.fsm_state == "moving":
-            if agent.update(1/FPS):
-                self.current_action = f"Nettoyage de {agent.target_room.name}..."
-                agent.start_cleaning(agent.target_room)
-                self.fsm_state = "cleaning"
-        
-        elif self.fsm_state == "cleaning":
-            if agent.update_cleaning(1/FPS, agent.target_room):
-                agent.target_room.clean(self.elapsed_time)
-                agent.total_cleanings += 1
-                
-                if agent.needs_maintenance():
-                    self.current_action = "Maintenance → Station"
-                    agent.return_to_station(station.center)
-                    self.fsm_state = "returning"
-                else:
-                    dirty_rooms = self.environment.get_dirty_rooms()
-                    if dirty_rooms:
-                        target = agent.get_priority_room(dirty_rooms)
-                        agent.learn_room_pattern(target)
-                        self.current_action = f"Suivant: {target.name}"
-                        agent.move_to(target.center, target)
-                        self.fsm_state = "moving"
-                    else:
-                        self.current_action = "Terminé → Retour station"
-                        agent.return_to_station(station.center)
-                        self.fsm_state = "returning"
-        
-        elif self.fsm_state == "returning":
-            if agent.update(1/FPS):
-                if agent.dirt_level >= MAX_DIRT_CAPACITY * 0.8:
-                    self.current_action = "🗑️ Vidage..."
-                    agent.start_emptying()
-                    self.fsm_state = "emptying"
-                elif agent.battery < 90:
-                    self.current_action = "🔋 Recharge..."
-                    agent.start_charging()
-                    self.fsm_state = "charging"
-                else:
-                    self.current_action = "Station → En attente"
-                    agent.state = AgentState.IDLE
-                    self.fsm_state = "waiting"
-        
-        elif self.fsm_state == "emptying":
-            if agent.update_emptying(1/FPS):
-                if agent.battery < 90:
-                    self.current_action = "🔋 Recharge..."
-                    agent.start_charging()
-                    self.fsm_state = "charging"
-                else:
-                    self.current_action = "Maintenance terminée ✓"
-                    agent.state = AgentState.IDLE
-                    self.fsm_state = "waiting"
-        
-        elif self.fsm_state == "charging":
-            if agent.update_charging(1/FPS):
-                self.current_action = "Recharge terminée ✓"
-                agent.state = AgentState.IDLE
-                self.fsm_state = "waiting"
+        """Automate à états finis (toute la flotte)"""
+        self.environment.fleet.run_fsm(self.environment, 1/FPS, self.elapsed_time)
+    
+    def step(self, dt: float):
+        """Cycle automatique, saleté, station, FSM et particules"""
+        if self.cycle_timer >= CYCLE_DURATION:
+            self.cycle_timer = 0
+            if self.fsm_state == "waiting":
+                self.current_action = "Cycle: Analyse..."
+        
+        self.environment.update(dt, self.elapsed_time)
+        if self.telemetry is not None:
+            self.telemetry.publish(self.environment)
+    
+    def render(self, screen: Optional[pygame.Surface] = None):
+        """Dessine environnement et HUD (sur screen si fourni, hors écran)"""
+        if screen is not None:
+            self.screen = screen
+        self.screen.fill(Colors.BG)
+        self.environment.draw(self.screen)
+        self.draw_hud()
     
     def run(self):
         """Boucle principale"""
@@ -954,47 +3497,314 @@ class Game:
                         self.running = False
                     elif event.key == pygame.K_m:
                         # Toggle mode manuel
-                        self.environment.agent.manual_mode = not self.environment.agent.manual_mode
-                        if self.environment.agent.manual_mode:
-                            self.current_action = "🎮 Mode manuel activé"
-                            self.fsm_state = "manual"
-                        else:
-                            self.current_action = "🤖 Mode automatique"
-                            self.fsm_state = "waiting"
+                        agent = self.environment.agent
+                        self.environment.fleet.set_manual(agent, not agent.manual_mode)
+                    elif event.key == pygame.K_TAB and not self.environment.agent.manual_mode:
+                        self.environment.select_next_agent()
             
             # Contrôles manuels
             keys = pygame.key.get_pressed()
             self.handle_manual_control(keys)
             
-            # Génération de saleté
-            self.environment.update_dirt(self.elapsed_time)
-            
-            # Station
-            self.environment.station.update(dt)
-            
-            # Cycle automatique
-            if self.cycle_timer >= CYCLE_DURATION:
-                self.cycle_timer = 0
-                if self.fsm_state == "waiting":
-                    self.current_action = "Cycle: Analyse..."
-            
-            # FSM
-            self.run_fsm()
-            
-            # Agent updates (particules)
-            if self.environment.agent.state not in [AgentState.CLEANING, AgentState.MOVING, AgentState.RETURNING]:
-                self.environment.agent.update(dt)
+            self.step(dt)
             
             # Affichage
-            self.screen.fill(Colors.BG)
-            self.environment.draw(self.screen)
-            self.draw_hud()
-            
+            self.render()
             pygame.display.flip()
         
+        if self.environment.path_pool is not None:
+            self.environment.path_pool.shutdown()
+        if self.telemetry is not None:
+            self.telemetry.publish(self.environment, force=True)
+            self.telemetry.stop()
         pygame.quit()
 
+def run_headless(num_agents: int = 1, duration: float = CYCLE_DURATION,
+                 seed: Optional[int] = None, heuristic: str = "manhattan",
+                 floor_plan: Optional[str] = None, telemetry: Optional[TelemetryServer] = None,
+                 navmesh: bool = False, clearance: bool = False) -> Environment:
+    """Simulation sans affichage, à pas fixe de 1/FPS"""
+    if seed is not None:
+        random.seed(seed)
+    environment = Environment(num_agents, heuristic=heuristic, floor_plan=floor_plan, navmesh=navmesh,
+                              clearance=clearance)
+    environment.fleet.effects = False
+    
+    dt = 1 / FPS
+    elapsed_time = 0
+    for _ in range(int(duration * FPS)):
+        elapsed_time += dt
+        environment.update(dt, elapsed_time)
+        if telemetry is not None:
+            telemetry.publish(environment)
+    if telemetry is not None:
+        telemetry.publish(environment, force=True)  # État final, envoyé avant stop()
+    return environment
+
+# Réglage des constantes de comportement
+
+POLICY_SPACE = {
+    "dirt_weight": (1, 2, 3, 4),
+    "frequency_weight": (0, 0.25, 0.5, 1),
+    "maintenance_battery": (15, 25, 35),
+    "maintenance_bin": (0.8, 0.9, 1.0),
+    "empty_threshold": (0.5, 0.8, 1.0),
+    "charge_threshold": (70, 80, 90, 100),
+    "speed": (3, 4, 5, 6),
+}
+
+@dataclass
+class EpisodeResult:
+    cleanliness: float  # Part moyenne de pièces propres (échantillonnée chaque seconde)
+    distance: float  # Mètres parcourus par la flotte
+    battery_cycles: float  # Passages en recharge
+
+def run_episode(policy: Policy, seed: int, duration: float = CYCLE_DURATION, num_agents: int = 1,
+                floor_plan: Optional[str] = None) -> EpisodeResult:
+    """Épisode headless à graine fixe, mesuré pour le réglage"""
+    random.seed(seed)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        environment = Environment(num_agents, floor_plan=floor_plan, policy=policy)
+        fleet = environment.fleet
+        fleet.effects = False
+        n = len(fleet)
+        
+        dt = 1 / FPS
+        elapsed_time = 0
+        clean, samples, cycles = 0, 0, 0
+        charging = fleet.fsm_state[:n] == FSM_CHARGING
+        for step in range(int(duration * FPS)):
+            elapsed_time += dt
+            environment.update(dt, elapsed_time)
+            now_charging = fleet.fsm_state[:n] == FSM_CHARGING
+            cycles += int(np.count_nonzero(now_charging & ~charging))
+            charging = now_charging
+            if step % FPS == 0:
+                clean += environment.dirt_index.clean_count / len(environment.rooms)
+                samples += 1
+    return EpisodeResult(clean / max(1, samples), float(fleet.total_distance[:n].sum()) / 100, cycles)
+
+def _run_episode(args: tuple) -> EpisodeResult:
+    return run_episode(*args)
+
+def pareto_front(results: Dict[Policy, EpisodeResult]) -> List[Policy]:
+    """Configurations non dominées: propreté maximale, distance et recharges minimales"""
+    def dominates(a: EpisodeResult, b: EpisodeResult) -> bool:
+        no_worse = (a.cleanliness >= b.cleanliness and a.distance <= b.distance
+                    and a.battery_cycles <= b.battery_cycles)
+        return no_worse and astuple(a) != astuple(b)
+    front = [p for p, r in results.items() if not any(dominates(o, r) for o in results.values())]
+    return sorted(front, key=lambda p: -results[p].cleanliness)
+
+def pareto_ranks(results: Dict[Policy, EpisodeResult]) -> Dict[Policy, int]:
+    """Rang de chaque configuration par fronts de Pareto successifs"""
+    ranks, remaining, rank = {}, dict(results), 0
+    while remaining:
+        for policy in pareto_front(remaining):
+            ranks[policy] = rank
+            del remaining[policy]
+        rank += 1
+    return ranks
+
+class PolicyTuner:
+    """Recherche de constantes sur des épisodes headless parallèles (un processus par épisode),
+    résultats mis en cache par configuration, graine, durée, flotte et contenu du plan"""
+    def __init__(self, space: Dict[str, tuple] = POLICY_SPACE, duration: float = CYCLE_DURATION,
+                 num_agents: int = 1, floor_plan: Optional[str] = None, workers: Optional[int] = None,
+                 cache_path: Optional[str] = None):
+        self.space = space
+        self.duration = duration
+        self.num_agents = num_agents
+        self.floor_plan = floor_plan
+        # Empreinte du contenu: un plan modifié sous le même nom ne réutilise pas les épisodes
+        self.plan_key = NavigationData.plan_key(load_floor_plan(floor_plan) if floor_plan
+                                                else DEFAULT_FLOOR_PLAN)
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache: Dict[tuple, EpisodeResult] = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                for entry in json.load(f):
+                    key = (astuple(Policy(**entry["policy"])), entry["seed"], entry["duration"],
+                           entry["agents"], entry["plan"])
+                    self.cache[key] = EpisodeResult(**entry["result"])
+    
+    def _key(self, policy: Policy, seed: int) -> tuple:
+        return (astuple(policy), seed, self.duration, self.num_agents, self.plan_key)
+    
+    def _save_cache(self):
+        entries = [{"policy": asdict(Policy(*key[0])), "seed": key[1], "duration": key[2],
+                    "agents": key[3], "plan": key[4], "result": asdict(result)}
+                   for key, result in self.cache.items()]
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.cache_path)
+    
+    def evaluate(self, policies: List[Policy], seeds: List[int]) -> Dict[Policy, EpisodeResult]:
+        """Moyenne des épisodes de chaque configuration (seuls les manquants sont simulés)"""
+        missing = list(dict.fromkeys((p, s) for p in policies for s in seeds
+                                     if self._key(p, s) not in self.cache))
+        if missing:
+            jobs = [(p, s, self.duration, self.num_agents, self.floor_plan) for p, s in missing]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for (policy, seed), result in zip(missing, executor.map(_run_episode, jobs, chunksize=4)):
+                    self.cache[self._key(policy, seed)] = result
+            if self.cache_path:
+                self._save_cache()
+        
+        results = {}
+        for policy in dict.fromkeys(policies):
+            episodes = [self.cache[self._key(policy, s)] for s in seeds]
+            results[policy] = EpisodeResult(*(sum(values) / len(episodes)
+                                              for values in zip(*map(astuple, episodes))))
+        return results
+    
+    def grid(self, seeds: List[int]) -> Dict[Policy, EpisodeResult]:
+        names = list(self.space)
+        policies = [Policy(**dict(zip(names, values))) for values in itertools.product(*self.space.values())]
+        return self.evaluate(policies, seeds)
+    
+    def sample(self, count: int, rng: random.Random) -> List[Policy]:
+        """Configurations tirées au hasard (la politique par défaut en premier)"""
+        policies = [Policy()]
+        while len(policies) < count:
+            policies.append(Policy(**{name: rng.choice(values) for name, values in self.space.items()}))
+        return policies
+    
+    def random_search(self, trials: int, seeds: List[int], rng: random.Random) -> Dict[Policy, EpisodeResult]:
+        return self.evaluate(self.sample(trials, rng), seeds)
+    
+    def successive_halving(self, trials: int, seeds: List[int], rng: random.Random,
+                           eta: int = 3) -> Dict[Policy, EpisodeResult]:
+        """Toutes les configurations sur peu de graines, puis le meilleur 1/eta
+        (rang de Pareto, puis propreté) sur eta fois plus de graines, jusqu'à toutes"""
+        policies = self.sample(trials, rng)
+        budget = 1
+        while True:
+            # Tirages identiques (même clé de cache): une seule place par rang
+            policies = list({astuple(p): p for p in policies}.values())
+            results = self.evaluate(policies, seeds[:budget])
+            if budget >= len(seeds) or len(policies) <= 1:
+                return results
+            ranks = pareto_ranks(results)
+            policies.sort(key=lambda p: (ranks[p], -results[p].cleanliness))
+            policies = policies[:max(1, math.ceil(len(policies) / eta))]
+            budget = min(len(seeds), budget * eta)
+
+def print_pareto_front(results: Dict[Policy, EpisodeResult]):
+    default = Policy()
+    print(f"{len(results)} configurations, front de Pareto:")
+    for policy in pareto_front(results):
+        result = results[policy]
+        changes = ", ".join(f"{name}={value}" for name, value in asdict(policy).items()
+                            if value != getattr(default, name)) or "par défaut"
+        print(f"  propreté {result.cleanliness:6.1%}  {result.distance:7.1f}m  "
+              f"{result.battery_cycles:5.1f} recharges  {changes}")
+
+def run_offscreen(exporter: FrameExporter, num_agents: int = 1, duration: float = CYCLE_DURATION,
+                  seed: Optional[int] = None, planning: str = "sync", heuristic: str = "manhattan",
+                  floor_plan: Optional[str] = None, every: int = 1, navmesh: bool = False,
+                  clearance: bool = False) -> Game:
+    """Simulation à pas fixe aussi vite que possible, une image sur `every` dessinée hors écran"""
+    if seed is not None:
+        random.seed(seed)
+    game = Game(num_agents, planning, heuristic, floor_plan, offscreen=True, navmesh=navmesh, clearance=clearance)
+    dt = 1 / FPS
+    try:
+        for frame in range(int(duration * FPS)):
+            game.elapsed_time += dt
+            game.cycle_timer += dt
+            game.step(dt)
+            if frame % every == 0:
+                surface = exporter.acquire()
+                game.render(surface)
+                exporter.submit(surface)
+    finally:
+        exporter.close()
+        if game.environment.path_pool is not None:
+            game.environment.path_pool.shutdown()
+    return game
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Aspirateur autonome intelligent A*")
+    parser.add_argument("--agents", type=int, default=1, help="Nombre d'aspirateurs")
+    parser.add_argument("--headless", action="store_true", help="Simulation sans affichage")
+    parser.add_argument("--duration", type=float, default=CYCLE_DURATION,
+                        help="Durée simulée en secondes (mode headless)")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+    parser.add_argument("--planning", choices=["async", "sliced", "sync"], default="async",
+                        help="Calcul des chemins: pool de threads, tranches par frame ou synchrone")
+    parser.add_argument("--heuristic", choices=["manhattan", "alt"], default="manhattan",
+                        help="Heuristique A* (alt: landmarks + recherche bidirectionnelle)")
+    parser.add_argument("--plan", default=None, help="Plan JSON (cache de navigation: <plan>.navcache)")
+    parser.add_argument("--navmesh", action="store_true",
+                        help="Chemins sur un quadtree de l'espace libre (un agent, planification sync/async)")
+    parser.add_argument("--clearance", action="store_true",
+                        help="Chemins au rayon du robot: obstacles gonflés, cases frôlant un meuble pénalisées")
+    parser.add_argument("--telemetry", type=int, default=None, metavar="PORT",
+                        help="Serveur de télémétrie TCP (une trame JSON par ligne)")
+    parser.add_argument("--watch", default=None, metavar="HOTE:PORT", help="Affiche la télémétrie d'une simulation")
+    parser.add_argument("--export", default=None, metavar="SORTIE",
+                        help="Rendu hors écran: dossier d'images PNG ou fichier vidéo brut (RGB24)")
+    parser.add_argument("--export-format", choices=["png", "raw"], default="png", help="Format d'export")
+    parser.add_argument("--export-every", type=int, default=1, help="Une image exportée toutes les N frames")
+    parser.add_argument("--tune", choices=["grid", "random", "halving"], default=None,
+                        help="Réglage des constantes de comportement sur des épisodes headless")
+    parser.add_argument("--trials", type=int, default=27, help="Configurations tirées (random, halving)")
+    parser.add_argument("--episodes", type=int, default=9, help="Graines par configuration")
+    parser.add_argument("--workers", type=int, default=None, help="Processus (défaut: un par coeur)")
+    parser.add_argument("--tune-cache", default="tuning_cache.json", help="Cache des épisodes (JSON)")
+    return parser.parse_args()
+
 # Point d'entrée
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    args = parse_args()
+    if args.watch:
+        host, _, port = args.watch.rpartition(":")
+        def show(state):
+            agents = " | ".join(f"{a['state']} ({a['x']:.0f},{a['y']:.0f}) {a['battery']:.0f}%"
+                                for a in state["agents"])
+            print(f"[{state['frame']}] {agents}")
+        try:
+            asyncio.run(watch_telemetry(host or "127.0.0.1", int(port), on_state=show))
+        except KeyboardInterrupt:
+            pass
+    elif args.export:
+        exporter = FrameExporter(args.export, args.export_format, workers=args.workers or os.cpu_count() or 1)
+        start = time.perf_counter()
+        run_offscreen(exporter, args.agents, args.duration, args.seed, "sync", args.heuristic, args.plan,
+                      args.export_every, args.navmesh, args.clearance)
+        print(f"🎞️ {exporter.frames} images {exporter.size[0]}x{exporter.size[1]} → {args.export} "
+              f"en {time.perf_counter() - start:.1f}s ({FPS / args.export_every:.0f} images par seconde simulée)")
+    elif args.tune:
+        tuner = PolicyTuner(duration=args.duration, num_agents=args.agents, floor_plan=args.plan,
+                            workers=args.workers, cache_path=args.tune_cache)
+        first_seed = args.seed if args.seed is not None else 0
+        seeds = list(range(first_seed, first_seed + args.episodes))
+        rng = random.Random(first_seed)
+        if args.tune == "grid":
+            results = tuner.grid(seeds)
+        elif args.tune == "random":
+            results = tuner.random_search(args.trials, seeds, rng)
+        else:
+            results = tuner.successive_halving(args.trials, seeds, rng)
+        print_pareto_front(results)
+    elif args.headless:
+        telemetry = TelemetryServer(port=args.telemetry).start() if args.telemetry is not None else None
+        environment = run_headless(args.agents, args.duration, args.seed, args.heuristic, args.plan, telemetry,
+                                   args.navmesh, args.clearance)
+        if telemetry is not None:
+            telemetry.stop()
+        fleet = environment.fleet
+        print(f"🤖 {len(fleet)} agents, {args.duration:.0f}s simulées: "
+              f"{int(fleet.total_cleanings[:len(fleet)].sum())} nettoyages, "
+              f"{fleet.total_distance[:len(fleet)].sum() / 100:.1f}m parcourus")
+    else:
+        if args.seed is not None:
+            random.seed(args.seed)
+        game = Game(args.agents, args.planning, args.heuristic, args.plan, navmesh=args.navmesh,
+                    clearance=args.clearance)
+        if args.telemetry is not None:
+            game.telemetry = TelemetryServer(port=args.telemetry).start()
+        game.run()
\ No newline at end of file